@@ -0,0 +1,266 @@
+import os
+import json
+import math
+import time
+import uuid
+import fcntl
+import tempfile
+from contextlib import contextmanager
+from functools import wraps
+from flask import request, jsonify
+from storage import dataset_shape
+from issue_index import index_is_fresh
+from correlations import MAX_SAMPLE_ROWS, BLOCK_CELLS
+
+# Average in-memory size of one cell once loaded into pandas
+BYTES_PER_CELL = 16
+
+# Peak memory of each operation as a multiple of the loaded dataset
+MEMORY_FACTORS = {
+    'upload': 4,
+    'detect_issues': 3,
+    'suggest_fixes': 2,
+    'apply_fixes': 3,
+    'generate_report': 2,
+    'correlations': 2,     # The version is patched, then sampled
+    'issue_rows': 3,       # Rebuilding the row index runs full detection
+    'rollback': 2          # Materializes the version and rewrites its files
+}
+
+# Working copies of the row sample held by the correlation stage
+# (centered values, masks, squares and ranks), on top of the batches
+# of Cramér's V tables
+CORRELATION_SAMPLE_COPIES = 8
+
+# Rough throughput used to predict how long admitted work will run
+CELLS_PER_SECOND = 5_000_000
+KNN_DISTANCE_OPS_PER_SECOND = 200_000_000
+
+# scikit-learn computes KNN distances in chunks of about this size
+KNN_WORKING_MEMORY = 1024 * 1024 * 1024
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request cannot be admitted. status is 503 for a transient
+    overload (retry after retry_after seconds) and 413 for work that can
+    never fit the budget.
+    """
+
+    def __init__(self, reason, status=503, retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+def _default_memory_budget():
+    # Half of physical memory, shared by every worker on the node
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2
+    except (ValueError, OSError, AttributeError):
+        return 2 * 1024 ** 3
+
+def estimate_cost(operation, rows, columns, payload=None):
+    """
+    Estimate memory (bytes), CPU slots and run time (seconds) of an
+    operation on a dataset of the given shape.
+
+    apply_fixes with a KNN fix also pays for the pairwise distance chunks,
+    whose cost grows with the square of the row count. issue_rows is only
+    charged when the row index has to be rebuilt; paging through a built
+    index reads just the requested rows. Correlations, which the report
+    also profiles, add their working set on a sample of the rows.
+    """
+    payload = payload or {}
+    cells = rows * columns
+    memory = cells * BYTES_PER_CELL * MEMORY_FACTORS.get(operation, 2)
+    seconds = cells / CELLS_PER_SECOND * MEMORY_FACTORS.get(operation, 2)
+    cpu = 1
+    
+    if operation in ('correlations', 'generate_report'):
+        # float64 copies of the sample, and one batch of keys and tables
+        sample_cells = min(rows, MAX_SAMPLE_ROWS) * columns
+        memory += sample_cells * 8 * CORRELATION_SAMPLE_COPIES + BLOCK_CELLS * 8 * 4
+        seconds += sample_cells / CELLS_PER_SECOND * CORRELATION_SAMPLE_COPIES
+
+    if operation == 'issue_rows' and payload.get('filepath') and index_is_fresh(payload['filepath']):
+        memory, seconds = 0, 0.0
+
+    if operation == 'apply_fixes':
+        selected = [
+            fix_info.get('selected') or {}
+            for section in (payload.get('fixes') or {}).values()
+            for fix_info in section.values()
+        ]
+        if any(selected_fix.get('method') == 'knn' for selected_fix in selected):
+            memory += min(rows * rows * 8, KNN_WORKING_MEMORY)
+            seconds += rows * rows * columns / KNN_DISTANCE_OPS_PER_SECOND
+        # Column fixes run on a thread pool
+        cpu = max(1, min(os.cpu_count() or 1, len(selected)))
+
+    return {'memory': int(memory), 'cpu': cpu, 'seconds': float(seconds)}
+
+class AdmissionController:
+    """
+    Admission control shared by all worker processes on a node.
+
+    Reservations live in a small JSON ledger guarded by flock, so every
+    gunicorn worker sees the same in-flight memory and CPU totals.
+    Requests that do not fit wait in a bounded queue for up to
+    queue_timeout seconds and are then rejected with a Retry-After hint.
+    Entries of processes that died are dropped on the next update.
+    """
+
+    def __init__(self, memory_budget=None, cpu_slots=None, max_queue=16,
+                 queue_timeout=30.0, state_path=None):
+        self.memory_budget = memory_budget or _default_memory_budget()
+        self.cpu_slots = cpu_slots or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.state_path = state_path or os.path.join(tempfile.gettempdir(), 'ml_data_prep_admission.json')
+
+    @contextmanager
+    def _state(self):
+        with open(self.state_path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.state_path) as f:
+                        state = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    state = {'running': {}, 'queued': {}, 'admitted': 0, 'rejected': 0}
+
+                for entries in (state['running'], state['queued']):
+                    for token in [token for token, entry in entries.items() if not _pid_alive(entry['pid'])]:
+                        del entries[token]
+
+                try:
+                    yield state
+                finally:
+                    # Saved on rejections too, so the counters stay accurate
+                    tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.state_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _fits(self, state, cost):
+        memory = sum(entry['memory'] for entry in state['running'].values())
+        cpu = sum(entry['cpu'] for entry in state['running'].values())
+        # A single request is always let through on an idle node
+        if not state['running']:
+            return True
+        return memory + cost['memory'] <= self.memory_budget and cpu + cost['cpu'] <= self.cpu_slots
+
+    def _retry_after(self, state):
+        # Time until the in-flight work is expected to finish
+        now = time.time()
+        remaining = [
+            entry['started'] + entry['seconds'] - now for entry in state['running'].values()
+        ]
+        return max(1, math.ceil(max(remaining, default=1)))
+
+    def acquire(self, cost):
+        """
+        Reserve budget for a request, waiting in the queue if needed.
+        Returns a token for release(); raises AdmissionRejected.
+        """
+        if cost['memory'] > self.memory_budget:
+            with self._state() as state:
+                state['rejected'] += 1
+            raise AdmissionRejected('Dataset is too large for this operation', status=413)
+
+        token = uuid.uuid4().hex
+        entry = dict(cost, pid=os.getpid(), started=time.time())
+        deadline = time.time() + self.queue_timeout
+        delay = 0.05
+
+        while True:
+            with self._state() as state:
+                queued = token in state['queued']
+                if self._fits(state, cost):
+                    state['queued'].pop(token, None)
+                    state['running'][token] = dict(entry, started=time.time())
+                    state['admitted'] += 1
+                    return token
+
+                if not queued and len(state['queued']) >= self.max_queue:
+                    state['rejected'] += 1
+                    raise AdmissionRejected('Server is busy', retry_after=self._retry_after(state))
+
+                if time.time() >= deadline:
+                    state['queued'].pop(token, None)
+                    state['rejected'] += 1
+                    raise AdmissionRejected('Server is busy', retry_after=self._retry_after(state))
+
+                state['queued'][token] = entry
+
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def release(self, token):
+        with self._state() as state:
+            state['running'].pop(token, None)
+
+    def stats(self):
+        with self._state() as state:
+            return {
+                'running': len(state['running']),
+                'queue_depth': len(state['queued']),
+                'memory_in_use': sum(entry['memory'] for entry in state['running'].values()),
+                'cpu_in_use': sum(entry['cpu'] for entry in state['running'].values()),
+                'memory_budget': self.memory_budget,
+                'cpu_slots': self.cpu_slots,
+                'admitted': state['admitted'],
+                'rejected': state['rejected']
+            }
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def admission_required(controller, operation):
+    """
+    Route decorator that admits the request through controller before
+    running it. The cost is estimated from the shape of the dataset named
+    by the request's filepath (or the upload size); requests without a
+    readable dataset go straight through so the route can report the error.
+    """
+    def decorator(route):
+        @wraps(route)
+        def wrapper(*args, **kwargs):
+            try:
+                if operation == 'upload':
+                    # Assume ~8 bytes of CSV text per cell
+                    shape = ((request.content_length or 0) // 8, 1)
+                    payload = {}
+                else:
+                    payload = request.get_json(silent=True) or {}
+                    filepath = payload.get('filepath') or payload.get('original_filepath')
+                    shape = dataset_shape(filepath) if filepath and os.path.exists(filepath) else None
+            except Exception:
+                shape = None
+
+            if shape is None:
+                return route(*args, **kwargs)
+
+            try:
+                token = controller.acquire(estimate_cost(operation, *shape, payload))
+            except AdmissionRejected as e:
+                response = jsonify({'error': e.reason})
+                response.status_code = e.status
+                if e.retry_after is not None:
+                    response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            try:
+                return route(*args, **kwargs)
+            finally:
+                controller.release(token)
+        return wrapper
+    return decorator
@@ -1,34 +1,74 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Blueprint, current_app, request, jsonify, send_from_directory
 from flask_cors import CORS
 import pandas as pd
-import numpy as np
 import os
-import json
+import importlib
 from werkzeug.utils import secure_filename
 import tempfile
 from data_processor import (
     get_data_summary,
     detect_issues,
+    detect_issues_incremental,
     suggest_fixes,
     apply_fixes
 )
 from report_generator import generate_report
+from storage import load_dataset, save_dataset, write_arrow
+from issue_index import build_issue_index, query_issue_rows
+from responses import NumpyJSONProvider, compress_response, parse_fields, shape_summary, shape_issues
+from version_store import (
+    ROOT_VERSION, load_manifest, load_version, sample_version, commit_version, rollback, version_metrics,
+    get_applied_fixes
+)
+from admission import AdmissionController, admission_required
+from correlations import MAX_SAMPLE_ROWS, profile_correlations
+from fingerprint import fingerprint_upload, load_fingerprint, summarize_fingerprint, get_cached_result, store_result, record_selections, reuse_selections
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
 # Configuration
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'csv'}
+RESPONSE_LAYOUTS = {'records', 'columnar'}
+
+# Slow-to-import engines that modules only load when a request needs them
+HEAVY_ENGINES = ['sklearn.ensemble', 'sklearn.impute']
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
+# Global CPU/memory budget shared by all workers; heavy requests beyond it
+# are queued, then rejected with Retry-After
+admission = AdmissionController(
+    memory_budget=int(os.environ.get('ADMISSION_MEMORY_BUDGET_MB', 0)) * 1024 * 1024 or None,
+    cpu_slots=int(os.environ.get('ADMISSION_CPU_SLOTS', 0)) or None,
+    max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', 16)),
+    queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 30))
+)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.route('/api/upload', methods=['POST'])
+def get_response_shape():
+    """
+    Read the optional `layout` and `fields` query parameters.
+    """
+    layout = request.args.get('layout', 'records')
+    if layout not in RESPONSE_LAYOUTS:
+        raise ValueError(f'Unknown layout {layout!r}')
+    return layout, parse_fields(request.args.get('fields'))
+
+def get_cleaned_filepath(filepath):
+    """
+    Path of the downloadable cleaned copy of an uploaded dataset.
+    """
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'cleaned_' + os.path.basename(filepath))
+
+@api.route('/api/upload', methods=['POST'])
+@admission_required(admission, 'upload')
 def upload_file():
+    try:
+        layout, fields = get_response_shape()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     
@@ -39,12 +79,16 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         try:
             df = pd.read_csv(filepath)
-            summary = get_data_summary(df)
+            # Convert once so later requests can memory map the dataset
+            write_arrow(df, filepath)
+            # Match against earlier extracts of the same feed
+            fingerprint = fingerprint_upload(filepath, df)
+            summary = shape_summary(get_data_summary(df), fields, layout)
             
             # Store filepath in session or DB for later use
             # For simplicity, we'll just return it to frontend
@@ -52,32 +96,83 @@ def upload_file():
                 'message': 'File uploaded successfully',
                 'filename': filename,
                 'filepath': filepath,
-                'summary': summary
+                'summary': summary,
+                'fingerprint': summarize_fingerprint(fingerprint)
             }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     return jsonify({'error': 'File type not allowed'}), 400
 
-@app.route('/api/detect-issues', methods=['POST'])
+@api.route('/api/detect-issues', methods=['POST'])
+@admission_required(admission, 'detect_issues')
 def detect_file_issues():
     data = request.json
     filepath = data.get('filepath')
     
+    try:
+        layout, fields = get_response_shape()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if not filepath or not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        df = pd.read_csv(filepath)
-        issues = detect_issues(df)
+        # A byte-identical file was already scanned; the row index for
+        # drill-down is rebuilt lazily if needed
+        fingerprint = load_fingerprint(filepath)
+        issues = get_cached_result(fingerprint, 'detect_issues')
+        cached = issues is not None
+        if not cached:
+            df = load_dataset(filepath)
+            # Also records the offending rows of each issue for drill-down
+            issues = build_issue_index(filepath, df)
+            store_result(fingerprint, 'detect_issues', issues)
         
         return jsonify({
-            'issues': issues
+            'issues': shape_issues(issues, fields, layout),
+            'cached': cached
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/suggest-fixes', methods=['POST'])
+@api.route('/api/issue-rows', methods=['POST'])
+@admission_required(admission, 'issue_rows')
+def get_issue_rows():
+    data = request.json
+    filepath = data.get('filepath')
+    issue_type = data.get('issue_type')
+    column = data.get('column')
+    
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    if not issue_type or not column:
+        return jsonify({'error': 'Missing issue type or column'}), 400
+    
+    try:
+        page = query_issue_rows(
+            filepath,
+            issue_type,
+            column,
+            cursor=data.get('cursor'),
+            limit=data.get('limit', 50),
+            filters=data.get('filters'),
+            sort_by=data.get('sort_by'),
+            descending=bool(data.get('descending', False))
+        )
+        
+        return jsonify(page), 200
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/suggest-fixes', methods=['POST'])
+@admission_required(admission, 'suggest_fixes')
 def suggest_file_fixes():
     data = request.json
     filepath = data.get('filepath')
@@ -87,62 +182,185 @@ def suggest_file_fixes():
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        df = pd.read_csv(filepath)
-        fixes = suggest_fixes(df, issues)
+        fingerprint = load_fingerprint(filepath)
+        fixes = get_cached_result(fingerprint, 'suggest_fixes', issues)
+        cached = fixes is not None
+        if not cached:
+            df = load_dataset(filepath)
+            fixes = suggest_fixes(df, issues)
+            store_result(fingerprint, 'suggest_fixes', fixes, issues)
+        
+        # Pre-select what was applied to earlier extracts of the feed
+        fixes = reuse_selections(fingerprint, fixes)
+        
+        return jsonify({
+            'fixes': fixes,
+            'cached': cached
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/correlations', methods=['POST'])
+@admission_required(admission, 'correlations')
+def get_correlations():
+    data = request.json
+    filepath = data.get('filepath')
+    
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    try:
+        # Profiles the current head unless a cleaning round is given
+        version_id = data.get('version_id') or load_manifest(filepath)['head']
+        sample, total_rows = sample_version(filepath, version_id, MAX_SAMPLE_ROWS)
         
         return jsonify({
-            'fixes': fixes
+            'version_id': version_id,
+            'correlations': profile_correlations(sample, total_rows=total_rows)
         }), 200
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/apply-fixes', methods=['POST'])
+@api.route('/api/apply-fixes', methods=['POST'])
+@admission_required(admission, 'apply_fixes')
 def apply_file_fixes():
     data = request.json
     filepath = data.get('filepath')
     fixes = data.get('fixes')
+    previous_issues = data.get('issues')
+    # Fixes are suggested for the uploaded data unless a version is given
+    parent_id = data.get('version_id') or ROOT_VERSION
     
     if not filepath or not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        df = pd.read_csv(filepath)
+        df = load_version(filepath, parent_id)
         updated_df, applied_fixes = apply_fixes(df, fixes)
         
+        # Record this cleaning round as a diff against its parent
+        version_id = commit_version(filepath, parent_id, df, updated_df, applied_fixes)
+        
+        # Selections made on the upload itself become the feed's defaults
+        if parent_id == ROOT_VERSION:
+            record_selections(load_fingerprint(filepath), fixes, applied_fixes)
+        
+        # Re-detect issues on the cleaned data, only rescanning what the
+        # fixes touched when the client sends back the previous issues
+        if previous_issues is not None:
+            updated_issues = detect_issues_incremental(df, updated_df, previous_issues, applied_fixes)
+        else:
+            updated_issues = detect_issues(updated_df.reset_index(drop=True))
+        
         # Save the updated dataframe to a new file
-        output_filepath = os.path.join(
-            app.config['UPLOAD_FOLDER'], 
-            'cleaned_' + os.path.basename(filepath)
-        )
-        updated_df.to_csv(output_filepath, index=False)
+        output_filepath = get_cleaned_filepath(filepath)
+        save_dataset(updated_df, output_filepath)
         
         return jsonify({
             'message': 'Fixes applied successfully',
             'output_filepath': output_filepath,
-            'applied_fixes': applied_fixes
+            'version_id': version_id,
+            'applied_fixes': applied_fixes,
+            'issues': updated_issues
         }), 200
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/generate-report', methods=['POST'])
+@api.route('/api/versions', methods=['POST'])
+def list_versions():
+    data = request.json
+    filepath = data.get('filepath')
+    
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    try:
+        manifest = load_manifest(filepath)
+        
+        return jsonify({
+            'head': manifest['head'],
+            'versions': manifest['versions']
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/versions/rollback', methods=['POST'])
+@admission_required(admission, 'rollback')
+def rollback_version():
+    data = request.json
+    filepath = data.get('filepath')
+    version_id = data.get('version_id')
+    
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    if not version_id:
+        return jsonify({'error': 'Missing version id'}), 400
+    
+    try:
+        manifest = rollback(filepath, version_id)
+        
+        # The downloadable cleaned file follows the head
+        output_filepath = get_cleaned_filepath(filepath)
+        save_dataset(load_version(filepath, version_id), output_filepath)
+        
+        return jsonify({
+            'message': 'Rolled back successfully',
+            'head': manifest['head'],
+            'output_filepath': output_filepath
+        }), 200
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/generate-report', methods=['POST'])
+@admission_required(admission, 'generate_report')
 def create_report():
     data = request.json
     original_filepath = data.get('original_filepath')
     cleaned_filepath = data.get('cleaned_filepath')
     applied_fixes = data.get('applied_fixes')
+    version_id = data.get('version_id')
     
-    if not original_filepath or not cleaned_filepath:
+    # With a version id the metrics come from the stored diffs, so only
+    # the original file is needed
+    if not original_filepath or not (cleaned_filepath or version_id):
         return jsonify({'error': 'Missing file paths'}), 400
     
-    if not os.path.exists(original_filepath) or not os.path.exists(cleaned_filepath):
+    if not os.path.exists(original_filepath) or not (version_id or os.path.exists(cleaned_filepath)):
         return jsonify({'error': 'File not found'}), 404
     
     try:
+        # Without a version id, report on the current head if it is a
+        # cleaning round, with the fixes of every round leading to it
+        if not version_id:
+            head = load_manifest(original_filepath)['head']
+            if head != ROOT_VERSION:
+                version_id = head
+                applied_fixes = get_applied_fixes(original_filepath, head)
+        elif applied_fixes is None:
+            applied_fixes = get_applied_fixes(original_filepath, version_id)
+        
+        metrics = version_metrics(original_filepath, version_id) if version_id else None
+        # Relationships between columns of the cleaned data, profiled on a
+        # sample so the version is never materialized in full
+        correlations = None
+        if version_id:
+            sample, total_rows = sample_version(original_filepath, version_id, MAX_SAMPLE_ROWS)
+            correlations = profile_correlations(sample, total_rows=total_rows)
+        
         # Generate PDF report
         report_path = generate_report(
             original_filepath,
             cleaned_filepath,
-            applied_fixes
+            applied_fixes,
+            metrics,
+            correlations
         )
         
         return jsonify({
@@ -152,15 +370,53 @@ def create_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/admission-stats', methods=['GET'])
+def get_admission_stats():
+    try:
+        return jsonify(admission.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Add a route to serve HTML reports
-@app.route('/api/reports/<filename>', methods=['GET'])
+@api.route('/api/reports/<filename>', methods=['GET'])
 def serve_report(filename):
     return send_from_directory(tempfile.gettempdir(), filename)
 
 # Add a route to serve the cleaned CSV file
-@app.route('/api/download/<filename>', methods=['GET'])
+@api.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+
+def preload_engines():
+    """
+    Import the heavy engines now instead of on first use.
+    """
+    for module in HEAVY_ENGINES:
+        importlib.import_module(module)
+
+def create_app(preload=False):
+    """
+    Build the Flask app.
+    
+    With preload, the heavy engines are imported up front. Meant for
+    gunicorn --preload: the master imports everything once before forking,
+    and workers share those pages copy-on-write instead of each paying
+    the import on its first request.
+    """
+    app = Flask(__name__)
+    app.json = NumpyJSONProvider(app)
+    app.after_request(compress_response)
+    CORS(app)
+    
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
+    app.register_blueprint(api)
+    
+    if preload:
+        preload_engines()
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
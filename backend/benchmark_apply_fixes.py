@@ -0,0 +1,44 @@
+"""
+Measure how apply_fixes scales with worker threads.
+
+Cleans a synthetic frame of float columns (10% missing, some outliers)
+with a median fill and an IQR cap on every column, once per worker count.
+"cores used" is the process CPU time over the wall time; it approaches
+the worker count when the column blocks really run in parallel.
+
+Usage: python benchmark_apply_fixes.py [rows] [columns]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from data_processor import apply_fixes
+
+def make_frame(rows, columns):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, columns))
+    X[rng.random((rows, columns)) < 0.1] = np.nan
+    X[::1000] *= 50
+    return pd.DataFrame(X, columns=[f'col_{i}' for i in range(columns)])
+
+def make_fixes(df):
+    return {
+        'missing_values': {col: {'selected': {'method': 'median'}} for col in df.columns},
+        'outliers': {col: {'selected': {'method': 'cap'}} for col in df.columns}
+    }
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    df = make_frame(rows, columns)
+    fixes = make_fixes(df)
+
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    print(f'{rows} rows x {columns} columns, {cores} cores')
+    for max_workers in workers:
+        start, cpu_start = time.perf_counter(), time.process_time()
+        apply_fixes(df, fixes, max_workers=max_workers)
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        print(f'{max_workers:>3} workers  {wall:6.2f}s  cores used {cpu / wall:.2f}')
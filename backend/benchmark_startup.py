@@ -0,0 +1,45 @@
+"""
+Measure backend startup time.
+
+Each case runs in a fresh interpreter so nothing is already imported:
+
+  import        import app, with the heavy engines loaded lazily
+  eager         import app and then every heavy engine, which is what
+                each worker used to pay before the first request
+  first detect  import app and detect the issues of the sample dataset,
+                which loads scikit-learn on demand
+
+Usage: python benchmark_startup.py [runs]
+"""
+import os
+import sys
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = {
+    'import': 'import app',
+    'eager': 'import app; app.preload_engines()',
+    'first detect': 'import app; app.detect_issues(app.load_dataset("sample_data.csv"))'
+}
+
+def time_case(code, runs):
+    timer = (
+        'import time; start = time.perf_counter(); '
+        f'{code}; '
+        'print(time.perf_counter() - start)'
+    )
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', timer], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, code in CASES.items():
+        times = time_case(code, runs)
+        print(f'{name:<14} median {statistics.median(times):.3f}s  min {min(times):.3f}s  ({runs} runs)')
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from sketches import CountMinSketch, HeavyHitters, DistinctCounter
+
+CHUNK_SIZE = 100_000
+RARE_LEVEL_SHARE = 0.01      # Levels below 1% of non-missing values are rare
+ID_LIKE_RATIO = 0.95         # Distinct/non-missing ratio of ID-like columns
+MIN_ROWS_FOR_PROFILE = 50    # Too few rows to judge rarity or cardinality
+
+def normalize_keys(values):
+    """
+    Normalize category labels so case, whitespace and punctuation variants
+    ("New York", "new york ", "NEW-YORK") share one key.
+    """
+    return (
+        pd.Series(values, dtype=object)
+        .str.casefold()
+        .str.replace(r'[\W_]+', ' ', regex=True)
+        .str.strip()
+        .to_numpy(dtype=object)
+    )
+
+def analyze_categorical(series, chunk_size=CHUNK_SIZE, capacity=200):
+    """
+    Profile a string column in one streaming pass with bounded memory.
+
+    Each chunk is reduced to its distinct hashes, which feed a Count-Min
+    sketch (frequencies), a Misra-Gries summary (frequent labels) and a
+    K-minimum-values counter (cardinality). Only the frequent labels are
+    normalized and grouped into variant clusters.
+    """
+    values = series.dropna()
+    total = len(values)
+
+    frequencies = CountMinSketch()
+    frequent = HeavyHitters(capacity)
+    distinct = DistinctCounter()
+
+    for start in range(0, total, chunk_size):
+        chunk = values.iloc[start:start + chunk_size].astype(str).to_numpy(dtype=object)
+        hashes = pd.util.hash_array(chunk)
+        unique_hashes, first_seen, counts = np.unique(hashes, return_index=True, return_counts=True)
+
+        frequencies.add(unique_hashes, counts)
+        distinct.add(unique_hashes)
+        frequent.update(dict(zip(chunk[first_seen], counts)))
+
+    labels = np.array(frequent.items(), dtype=object)
+    if len(labels) > 0:
+        estimates = frequencies.estimate(pd.util.hash_array(labels))
+    else:
+        estimates = np.array([], dtype=np.int64)
+
+    # Group frequent labels that only differ in case, spacing or punctuation
+    clusters = {}
+    for label, key, count in zip(labels, normalize_keys(labels), estimates):
+        clusters.setdefault(key, []).append((label, int(count)))
+
+    variant_clusters = []
+    for members in clusters.values():
+        if len(members) > 1:
+            members.sort(key=lambda member: -member[1])
+            variant_clusters.append({
+                'canonical': members[0][0],
+                'variants': [label for label, _ in members[1:]],
+                'count': sum(count for _, count in members)
+            })
+    variant_clusters.sort(key=lambda cluster: -cluster['count'])
+
+    # Levels above the rarity cutoff are all tracked by the summary as long
+    # as capacity >= 1 / RARE_LEVEL_SHARE, so everything else is rare
+    common_counts = estimates[estimates >= RARE_LEVEL_SHARE * total]
+    distinct_count = max(distinct.estimate(), len(labels))
+
+    return {
+        'rows': total,
+        'common_values': [label for label, count in zip(labels, estimates) if count >= RARE_LEVEL_SHARE * total],
+        'distinct_estimate': int(distinct_count),
+        'variant_clusters': variant_clusters,
+        'rare_levels': int(max(0, distinct_count - len(common_counts))),
+        'rare_rows': int(max(0, total - common_counts.sum())),
+        'top_values': [
+            {'value': label, 'count': int(count)}
+            for label, count in sorted(zip(labels, estimates), key=lambda item: -item[1])[:5]
+        ]
+    }
@@ -0,0 +1,299 @@
+import numpy as np
+import pandas as pd
+
+MAX_SAMPLE_ROWS = 5_000        # Rows used for the pairwise statistics
+BLOCK_COLUMNS = 256            # Columns per block of the blocked products
+MIN_REPORTED = 0.8             # Pairs below this strength are not reported
+MAX_PAIRS = 100                # Strongest pairs kept per statistic
+REDUNDANT = 0.95               # Pairs at or above this are likely redundant
+NEAR_CONSTANT_SHARE = 0.99     # Top value share of near-constant columns
+MAX_LEVELS = 100               # Categorical columns with more levels are skipped
+MAX_CATEGORICAL_COLUMNS = 200  # Categorical columns profiled for Cramér's V
+BLOCK_CELLS = 1 << 20          # Joint codes or table cells per batch of Cramér's V pairs
+RERANK_MARGIN = 0.05           # Spearman pairs with gaps this close to MIN_REPORTED are re-ranked
+
+def _pairwise_correlation(X, block_size=BLOCK_COLUMNS):
+    """
+    Pearson correlation of every pair of columns of X over the rows where
+    both are present, as pandas' DataFrame.corr computes it.
+
+    Works on column blocks so the intermediate products stay small. Each
+    block pair costs one product; the extra sums that pairwise deletion
+    needs are only computed for the columns that have missing values.
+    Yields (i, j, r) arrays for the upper triangle of each block pair.
+    """
+    present = ~np.isnan(X)
+    # Centering keeps the sums of squares numerically stable, and makes
+    # the column sums over complete pairs zero
+    X = np.where(present, X - np.nanmean(X, axis=0), 0.0)
+    M = present.astype(X.dtype)
+    X2 = X * X
+    gaps = ~present.all(axis=0)
+
+    starts = range(0, X.shape[1], block_size)
+    for a in starts:
+        cols_a = slice(a, a + block_size)
+        for b in starts:
+            if b < a:
+                continue
+            cols_b = slice(b, b + block_size)
+            sxy = X[:, cols_a].T @ X[:, cols_b]
+            shape = sxy.shape
+
+            n = np.full(shape, float(len(X)))
+            sx = np.zeros(shape)
+            sy = np.zeros(shape)
+            sxx = np.broadcast_to(X2[:, cols_a].sum(axis=0)[:, None], shape).copy()
+            syy = np.broadcast_to(X2[:, cols_b].sum(axis=0)[None, :], shape).copy()
+
+            # Rows of the block for columns with gaps, then its columns
+            rows = np.flatnonzero(gaps[cols_a])
+            if len(rows):
+                Ma, Xa, X2a = (arr[:, cols_a][:, rows] for arr in (M, X, X2))
+                n[rows] = Ma.T @ M[:, cols_b]
+                sx[rows] = Xa.T @ M[:, cols_b]
+                sy[rows] = Ma.T @ X[:, cols_b]
+                sxx[rows] = X2a.T @ M[:, cols_b]
+                syy[rows] = Ma.T @ X2[:, cols_b]
+            columns = np.flatnonzero(gaps[cols_b])
+            if len(columns):
+                Mb, Xb, X2b = (arr[:, cols_b][:, columns] for arr in (M, X, X2))
+                n[:, columns] = M[:, cols_a].T @ Mb
+                sx[:, columns] = X[:, cols_a].T @ Mb
+                sy[:, columns] = M[:, cols_a].T @ Xb
+                sxx[:, columns] = X2[:, cols_a].T @ Mb
+                syy[:, columns] = M[:, cols_a].T @ X2b
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+
+            i, j = np.meshgrid(np.arange(a, a + shape[0]), np.arange(b, b + shape[1]), indexing='ij')
+            upper = i < j
+            yield i[upper], j[upper], np.clip(r[upper], -1, 1)
+
+def _rank_columns(X):
+    """
+    Average ranks (ties share their mean rank) within each column of X,
+    with NaN left in place, computed for all columns at once.
+    """
+    Xt = np.ascontiguousarray(X.T)
+    order = np.argsort(Xt, axis=1)
+    sorted_values = np.take_along_axis(Xt, order, axis=1)
+
+    # Runs of equal values, numbered across all columns
+    new_run = np.ones(sorted_values.shape, dtype=bool)
+    new_run[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    new_run = new_run.ravel()
+    run_id = np.cumsum(new_run) - 1
+    starts = np.flatnonzero(new_run)
+    sizes = np.diff(np.append(starts, len(new_run)))
+    mean_rank = starts % Xt.shape[1] + (sizes + 1) / 2
+
+    ranks = np.empty(Xt.shape)
+    np.put_along_axis(ranks, order, mean_rank[run_id].reshape(Xt.shape), axis=1)
+    ranks[np.isnan(Xt)] = np.nan
+    return ranks.T
+
+def _rerank_gap_pairs(X, pairs, min_value, margin=RERANK_MARGIN):
+    """
+    Exact Spearman correlation for pairs of columns with gaps.
+
+    Ranking each column once over all of its values is slightly off for
+    such pairs: DataFrame.corr ranks them within the rows both columns
+    share. The error is small (a few thousandths), so only pairs within
+    margin of min_value are ranked again over their shared rows.
+    """
+    present = ~np.isnan(X)
+    gaps = ~present.all(axis=0)
+    if not gaps.any():
+        return pairs
+
+    reranked = []
+    for i, j, r in pairs:
+        r = r.copy()
+        close = (gaps[i] | gaps[j]) & (np.abs(np.nan_to_num(r)) >= min_value - margin)
+        for k in np.flatnonzero(close):
+            shared = present[:, i[k]] & present[:, j[k]]
+            ranks = _rank_columns(X[shared][:, [i[k], j[k]]])
+            r[k] = next(_pairwise_correlation(ranks))[2][0] if shared.sum() > 1 else np.nan
+        reranked.append((i, j, r))
+    return reranked
+
+def _strongest_pairs(columns, pairs, min_value, max_pairs):
+    # Keep the strongest pairs across all blocks
+    i, j, values = (np.concatenate(parts) for parts in zip(*pairs)) if pairs else ([], [], [])
+    values = np.asarray(values, dtype=float)
+    strong = np.flatnonzero(np.abs(np.nan_to_num(values)) >= min_value)
+    strong = strong[np.argsort(-np.abs(values[strong]), kind='stable')][:max_pairs]
+    return [
+        {'columns': [columns[i[k]], columns[j[k]]], 'value': round(float(values[k]), 4)}
+        for k in strong
+    ]
+
+def _cramers_v_block(codes_t, levels, a, b):
+    # Cramér's V of the column pairs (a[k], b[k]), from one bincount of
+    # their joint codes. Missing values carry code levels[col], an extra
+    # level whose row and column are cleared, and tables are padded to
+    # the batch's largest level counts.
+    n_pairs = len(a)
+    height, width = int(levels[a].max()) + 1, int(levels[b].max()) + 1
+    keys = codes_t[a] * width
+    keys += codes_t[b]
+    keys += (np.arange(n_pairs) * height * width)[:, None]
+    table = np.bincount(keys.ravel(), minlength=n_pairs * height * width)
+    table = table.reshape(n_pairs, height, width).astype(float)
+    table[np.arange(n_pairs), levels[a], :] = 0
+    table[np.arange(n_pairs), :, levels[b]] = 0
+
+    # Marginals over the rows where both columns are present
+    row_total = table.sum(axis=2)
+    col_total = table.sum(axis=1)
+    n = row_total.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = row_total[:, :, None] * col_total[:, None, :]
+        # Sum of n_pq^2 / (r_p * c_q) equals 1 + chi2 / n
+        phi2 = np.where(expected > 0, table * table / expected, 0.0).sum(axis=(1, 2)) - 1
+        k = np.minimum((row_total > 0).sum(axis=1), (col_total > 0).sum(axis=1))
+        v = np.sqrt(np.clip(phi2, 0, None) / (k - 1))
+    return np.where((k > 1) & (n > 0), np.minimum(v, 1.0), np.nan)
+
+def cramers_v_pairs(codes, levels, min_value=MIN_REPORTED, max_pairs=MAX_PAIRS, block_cells=BLOCK_CELLS):
+    """
+    Cramér's V of every pair of categorical columns.
+
+    codes is an (n_rows, n_columns) array of level codes (-1 for missing)
+    and levels the number of levels of each column. Contingency tables are
+    built for a batch of column pairs at a time, with at most block_cells
+    joint codes or table cells per batch, and each batch is reduced to its
+    strongest pairs before the next one starts, so memory stays bounded
+    whatever the number of columns. Marginals are taken over the rows
+    where both columns are present.
+    Returns a list of (i, j, v) for the pairs with v >= min_value.
+    """
+    n_rows, n_columns = codes.shape
+    levels = np.asarray(levels)
+    codes_t = np.where(codes.T < 0, levels[:, None], codes.T)
+    i, j = np.triu_indices(n_columns, k=1)
+    batch = max(1, block_cells // max(n_rows, (int(levels.max()) + 1) ** 2 if n_columns else 1))
+
+    found = []
+    for start in range(0, len(i), batch):
+        a, b = i[start:start + batch], j[start:start + batch]
+        v = _cramers_v_block(codes_t, levels, a, b)
+        strong = np.flatnonzero(v >= min_value)
+        found.extend((int(a[k]), int(b[k]), float(v[k])) for k in strong)
+        # Keep only what can still make the final list
+        if len(found) > max_pairs:
+            found = sorted(found, key=lambda pair: -pair[2])[:max_pairs]
+    return sorted(found, key=lambda pair: -pair[2])[:max_pairs]
+
+def find_constant_columns(df, sample, share=NEAR_CONSTANT_SHARE):
+    """
+    Columns whose most common value covers at least `share` of the
+    non-missing rows. The share is measured on the sample; a column is
+    only reported as constant after checking the full data.
+    """
+    found = []
+    for col in df.columns:
+        values = sample[col].dropna()
+        if len(values) == 0:
+            found.append({'column': col, 'constant': True, 'top_value': None, 'top_share': 1.0})
+            continue
+
+        if pd.api.types.is_numeric_dtype(values):
+            sorted_values = np.sort(values.to_numpy())
+            changes = np.flatnonzero(sorted_values[1:] != sorted_values[:-1])
+            bounds = np.concatenate([[-1], changes, [len(sorted_values) - 1]])
+            runs = np.diff(bounds)
+            top = int(np.argmax(runs))
+            top_count = int(runs[top])
+            top_value = sorted_values[bounds[top + 1]]
+        else:
+            codes, uniques = pd.factorize(values)
+            counts = np.bincount(codes)
+            top_count = int(counts.max())
+            top_value = uniques[int(counts.argmax())]
+
+        top_share = top_count / len(values)
+        if top_share >= share:
+            constant = top_share == 1.0 and df[col].nunique(dropna=True) <= 1
+            found.append({
+                'column': col,
+                'constant': bool(constant),
+                'top_value': top_value.item() if isinstance(top_value, np.generic) else top_value,
+                'top_share': round(float(top_share), 4)
+            })
+    return found
+
+def profile_correlations(df, max_rows=MAX_SAMPLE_ROWS, min_value=MIN_REPORTED, max_pairs=MAX_PAIRS, total_rows=None):
+    """
+    Profile relationships between columns.
+
+    Returns the strongest Pearson and Spearman correlations between
+    numeric columns, the strongest Cramér's V associations between
+    categorical columns, constant or near-constant columns, and the
+    column pairs that look redundant. Pairwise statistics use a random
+    sample of max_rows rows on larger datasets.
+
+    Cramér's V covers the first MAX_CATEGORICAL_COLUMNS categorical
+    columns; its cost grows with the square of the column count.
+
+    df may itself be a row sample of a dataset of total_rows rows (see
+    version_store.sample_version); constant columns are then only checked
+    on the sample.
+    """
+    sample = df.sample(n=max_rows, random_state=0) if len(df) > max_rows else df
+    total_rows = total_rows or len(df)
+
+    numeric_cols = [
+        col for col in df.columns
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+    ]
+    pearson = spearman = []
+    if len(numeric_cols) > 1:
+        X = sample[numeric_cols].to_numpy(dtype=float)
+        pearson = _strongest_pairs(numeric_cols, list(_pairwise_correlation(X)), min_value, max_pairs)
+        # Spearman is Pearson on the ranks
+        ranks = _rank_columns(X)
+        spearman_pairs = _rerank_gap_pairs(X, list(_pairwise_correlation(ranks)), min_value)
+        spearman = _strongest_pairs(numeric_cols, spearman_pairs, min_value, max_pairs)
+
+    categorical_cols = []
+    codes = []
+    levels = []
+    for col in df.columns:
+        if col in numeric_cols:
+            continue
+        col_codes, uniques = pd.factorize(sample[col])
+        # Skip ID-like columns, whose association with anything is meaningless
+        if 1 < len(uniques) <= min(MAX_LEVELS, len(sample) // 2):
+            if len(categorical_cols) == MAX_CATEGORICAL_COLUMNS:
+                break
+            categorical_cols.append(col)
+            codes.append(col_codes)
+            levels.append(len(uniques))
+    cramers_v = []
+    if len(categorical_cols) > 1:
+        cramers_v = [
+            {'columns': [categorical_cols[i], categorical_cols[j]], 'value': round(v, 4)}
+            for i, j, v in cramers_v_pairs(np.column_stack(codes), np.array(levels), min_value, max_pairs)
+        ]
+
+    redundant = []
+    seen = set()
+    for statistic, pairs in (('pearson', pearson), ('spearman', spearman), ('cramers_v', cramers_v)):
+        for pair in pairs:
+            key = tuple(pair['columns'])
+            if abs(pair['value']) >= REDUNDANT and key not in seen:
+                seen.add(key)
+                redundant.append(dict(pair, statistic=statistic))
+
+    return {
+        'rows_used': int(len(sample)),
+        'sampled': len(sample) < total_rows,
+        'pearson': pearson,
+        'spearman': spearman,
+        'cramers_v': cramers_v,
+        'constant_columns': find_constant_columns(df, sample),
+        'redundant_pairs': redundant
+    }
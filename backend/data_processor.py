@@ -1,8 +1,12 @@
+import os
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from sklearn.impute import KNNImputer
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dates import (
+    DATE_PATTERNS, factorize_strings, count_date_patterns, match_date_patterns, detect_day_first,
+    infer_input_formats, normalize_dates
+)
+from categorical import analyze_categorical, RARE_LEVEL_SHARE, ID_LIKE_RATIO, MIN_ROWS_FOR_PROFILE
 
 def get_data_summary(df):
     """
@@ -41,13 +45,16 @@ def get_data_summary(df):
     
     return summary
 
-def detect_missing_values(df):
+def detect_missing_values(df, columns=None, rows=None):
     """
     Detect columns with missing values.
+    
+    If columns is given, only those columns are checked. If rows is given,
+    the positions of offending rows are stored in it per (issue, column).
     """
     missing_values = {}
     
-    for col in df.columns:
+    for col in (df.columns if columns is None else columns):
         missing_count = df[col].isna().sum()
         if missing_count > 0:
             missing_values[col] = {
@@ -55,34 +62,50 @@ def detect_missing_values(df):
                 'percentage': float(missing_count / len(df) * 100),
                 'issue_type': 'missing_values'
             }
+            if rows is not None:
+                rows[('missing_values', col)] = np.flatnonzero(df[col].isna().to_numpy())
     
     return missing_values
 
-def detect_duplicates(df):
+def detect_duplicates(df, rows=None):
     """
     Detect duplicate rows in the dataframe.
+    
+    If rows is given, the positions of offending rows are stored in it.
     """
     duplicates = {}
+    duplicated = df.duplicated(keep='first')
     
-    if df.duplicated().any():
-        duplicate_count = df.duplicated().sum()
+    if duplicated.any():
+        duplicate_count = duplicated.sum()
         duplicates['rows'] = {
             'count': int(duplicate_count),
             'percentage': float(duplicate_count / len(df) * 100),
             'issue_type': 'duplicates',
-            'example_indices': df[df.duplicated(keep='first')].index[:5].tolist()
+            'example_indices': df[duplicated].index[:5].tolist()
         }
+        if rows is not None:
+            rows[('duplicates', 'rows')] = np.flatnonzero(duplicated.to_numpy())
     
     return duplicates
 
-def detect_outliers(df):
+def detect_outliers(df, columns=None, rows=None):
     """
     Detect outliers in numeric columns using Isolation Forest.
+    
+    If columns is given, only those columns are checked. If rows is given,
+    the positions of offending rows are stored in it per (issue, column).
     """
     outliers = {}
     numeric_cols = df.select_dtypes(include=['number']).columns
+    if columns is not None:
+        selected = set(columns)
+        numeric_cols = [col for col in numeric_cols if col in selected]
     
     if len(numeric_cols) > 0:
+        # scikit-learn is slow to import, so it is only loaded when needed
+        from sklearn.ensemble import IsolationForest
+        
         for col in numeric_cols:
             if df[col].isna().sum() < len(df) * 0.5:  # Skip if more than 50% missing
                 try:
@@ -106,76 +129,243 @@ def detect_outliers(df):
                             'issue_type': 'outliers',
                             'example_values': outlier_values[:5].tolist()
                         }
+                        if rows is not None:
+                            present = np.flatnonzero(df[col].notna().to_numpy())
+                            rows[('outliers', col)] = present[outlier_indexes]
                 except Exception as e:
                     # Skip columns where outlier detection fails
                     continue
     
     return outliers
 
-def detect_inconsistent_formats(df):
+def detect_inconsistent_formats(df, columns=None, rows=None):
     """
     Detect inconsistent formats in string columns (e.g., dates, phone numbers).
+    
+    If columns is given, only those columns are checked. If rows is given,
+    the positions of rows not in the dominant format are stored in it per
+    (issue, column).
     """
     inconsistent_formats = {}
     
-    # Function to check for different date formats
-    def has_different_date_formats(series):
-        date_patterns = [
-            r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
-            r'\d{2}/\d{2}/\d{4}',  # MM/DD/YYYY
-            r'\d{2}-\d{2}-\d{4}'   # DD-MM-YYYY
-        ]
-        
-        found_patterns = defaultdict(int)
-        for val in series.dropna():
-            for pattern in date_patterns:
-                if pd.Series([str(val)]).str.match(pattern).any():
-                    found_patterns[pattern] += 1
-                    break
-        
-        return len(found_patterns) > 1, found_patterns
-    
     # Check string columns for inconsistent formats
-    for col in df.select_dtypes(include=['object']).columns:
+    string_cols = df.select_dtypes(include=['object']).columns
+    if columns is not None:
+        selected = set(columns)
+        string_cols = [col for col in string_cols if col in selected]
+    
+    for col in string_cols:
+        # Factorized once; the date checks below only look at distinct values
+        factorized = factorize_strings(df[col])
+        
         # Try to identify date columns
-        has_diff_dates, patterns = has_different_date_formats(df[col])
+        patterns = count_date_patterns(df[col], factorized)
         
-        if has_diff_dates:
+        if len(patterns) > 1:
             inconsistent_formats[col] = {
                 'issue_type': 'inconsistent_format',
                 'format_type': 'date',
-                'patterns': {str(k): int(v) for k, v in patterns.items()},
-                'example_values': df[col].dropna().sample(min(5, df[col].nunique())).tolist()
+                'patterns': patterns,
+                # None per separator means dd/mm vs mm/dd could not be told apart
+                'day_first': detect_day_first(df[col], factorized),
+                'example_values': df[col].dropna().sample(min(5, len(factorized[1]))).tolist()
             }
+            if rows is not None:
+                dominant = DATE_PATTERNS.index(max(patterns, key=patterns.get))
+                matches = match_date_patterns(df[col], factorized)
+                rows[('inconsistent_formats', col)] = np.flatnonzero((matches >= 0) & (matches != dominant))
     
     return inconsistent_formats
 
-def detect_issues(df):
+def detect_categorical_issues(df, columns=None, rows=None):
+    """
+    Detect spelling variants, rare levels and ID-like cardinality in string
+    columns using bounded-memory sketches.
+    
+    If columns is given, only those columns are checked. If rows is given,
+    the positions of rows holding a variant or rare label (every labelled
+    row for ID-like columns) are stored in it per (issue, column).
+    """
+    categorical_issues = {}
+    
+    string_cols = df.select_dtypes(include=['object']).columns
+    if columns is not None:
+        selected = set(columns)
+        string_cols = [col for col in string_cols if col in selected]
+    
+    for col in string_cols:
+        profile = analyze_categorical(df[col])
+        n_rows = profile['rows']
+        
+        # Rarity and cardinality are meaningless on a handful of rows
+        profiled = n_rows >= MIN_ROWS_FOR_PROFILE
+        id_like = profiled and profile['distinct_estimate'] >= ID_LIKE_RATIO * n_rows
+        has_rare_levels = profiled and not id_like and profile['rare_levels'] > 0 and profile['rare_rows'] < n_rows
+        
+        if profile['variant_clusters'] or has_rare_levels or id_like:
+            categorical_issues[col] = {
+                'issue_type': 'categorical',
+                'distinct_estimate': profile['distinct_estimate'],
+                'id_like': bool(id_like),
+                'variant_clusters': profile['variant_clusters'][:10],
+                'rare_levels': profile['rare_levels'] if has_rare_levels else 0,
+                'rare_rows': profile['rare_rows'] if has_rare_levels else 0,
+                'top_values': profile['top_values']
+            }
+            if rows is not None:
+                present = df[col].notna().to_numpy()
+                if id_like:
+                    offending = present
+                else:
+                    variants = [variant for cluster in profile['variant_clusters'] for variant in cluster['variants']]
+                    offending = df[col].isin(variants).to_numpy()
+                    if has_rare_levels:
+                        offending |= present & ~df[col].isin(profile['common_values']).to_numpy()
+                rows[('categorical', col)] = np.flatnonzero(offending)
+    
+    return categorical_issues
+
+def detect_issues(df, rows=None):
     """
     Detect all issues in the dataframe.
+    
+    If rows is given, every detector stores the positions of the offending
+    rows of each issue in it, keyed by (issue, column).
     """
     issues = {}
     
     # Detect missing values
-    missing = detect_missing_values(df)
+    missing = detect_missing_values(df, rows=rows)
     if missing:
         issues['missing_values'] = missing
     
     # Detect duplicates
-    duplicates = detect_duplicates(df)
+    duplicates = detect_duplicates(df, rows=rows)
     if duplicates:
         issues['duplicates'] = duplicates
     
     # Detect outliers
-    outliers = detect_outliers(df)
+    outliers = detect_outliers(df, rows=rows)
     if outliers:
         issues['outliers'] = outliers
     
     # Detect inconsistent formats
-    inconsistent_formats = detect_inconsistent_formats(df)
+    inconsistent_formats = detect_inconsistent_formats(df, rows=rows)
     if inconsistent_formats:
         issues['inconsistent_formats'] = inconsistent_formats
     
+    # Detect categorical issues
+    categorical_issues = detect_categorical_issues(df, rows=rows)
+    if categorical_issues:
+        issues['categorical'] = categorical_issues
+    
+    return issues
+
+# Fix methods that rewrite column values; all other methods only remove rows
+VALUE_CHANGING_METHODS = {
+    'mean', 'median', 'mode', 'constant', 'knn', 'cap',
+    'standardize_date_yyyy_mm_dd', 'standardize_date_mm_dd_yyyy',
+    'merge_variants', 'bucket_rare'
+}
+
+def get_fix_footprint(df, updated_df, applied_fixes):
+    """
+    Work out which columns and rows the applied fixes touched.
+
+    apply_fixes keeps the original row labels, so removed rows are the
+    labels missing from the updated dataframe.
+    """
+    dirty_columns = set()
+    for fix in applied_fixes:
+        if fix.get('fix_method') in VALUE_CHANGING_METHODS and 'column' in fix:
+            dirty_columns.add(fix['column'])
+
+    return {
+        'dirty_columns': dirty_columns,
+        'dropped_rows': df.index.difference(updated_df.index)
+    }
+
+def detect_issues_incremental(df, updated_df, previous_issues, applied_fixes):
+    """
+    Re-detect issues on the fixed dataframe, reusing previous detect_issues
+    results for columns the fixes did not touch.
+
+    A column is recomputed when a fix rewrote its values, or when removed
+    rows carried non-missing values that the detector would have seen.
+    Missing value counts of untouched columns are adjusted from the removed
+    rows alone.
+    """
+    footprint = get_fix_footprint(df, updated_df, applied_fixes)
+    dirty_columns = footprint['dirty_columns']
+    dropped_rows = footprint['dropped_rows']
+    dropped_df = df.loc[dropped_rows]
+    total_rows = len(updated_df)
+
+    # Columns whose non-missing values lost rows
+    if len(dropped_rows) > 0:
+        thinned_columns = set(dropped_df.columns[dropped_df.notna().any()])
+    else:
+        thinned_columns = set()
+
+    issues = {}
+
+    # Missing values: recompute dirty columns, adjust the rest
+    missing = detect_missing_values(updated_df, columns=[
+        col for col in updated_df.columns if col in dirty_columns
+    ])
+    for col, info in previous_issues.get('missing_values', {}).items():
+        if col in dirty_columns or col not in updated_df.columns:
+            continue
+        count = info['count'] - int(dropped_df[col].isna().sum())
+        if count > 0:
+            missing[col] = {
+                'count': count,
+                'percentage': float(count / total_rows * 100),
+                'issue_type': 'missing_values'
+            }
+    missing = {col: missing[col] for col in updated_df.columns if col in missing}
+    if missing:
+        issues['missing_values'] = missing
+
+    # Duplicates span every column, so they are always recomputed
+    duplicates = detect_duplicates(updated_df.reset_index(drop=True))
+    if duplicates:
+        issues['duplicates'] = duplicates
+
+    # Outliers: the fit only sees non-missing values, so a column is stale
+    # when it was rewritten, lost values or crossed the 50% missing cutoff
+    previous_outliers = previous_issues.get('outliers', {})
+    stale_columns = []
+    for col in updated_df.select_dtypes(include=['number']).columns:
+        was_checked = df[col].isna().sum() < len(df) * 0.5
+        is_checked = updated_df[col].isna().sum() < total_rows * 0.5
+        if col in dirty_columns or col in thinned_columns or was_checked != is_checked:
+            stale_columns.append(col)
+    outliers = detect_outliers(updated_df, columns=stale_columns)
+    for col, info in previous_outliers.items():
+        if col in updated_df.columns and col not in stale_columns:
+            outliers[col] = info
+    outliers = {col: outliers[col] for col in updated_df.columns if col in outliers}
+    if outliers:
+        issues['outliers'] = outliers
+
+    # Inconsistent formats and categorical issues: same rule on string columns
+    stale_columns = [
+        col for col in updated_df.select_dtypes(include=['object']).columns
+        if col in dirty_columns or col in thinned_columns
+    ]
+    for issue_type, detector in [
+        ('inconsistent_formats', detect_inconsistent_formats),
+        ('categorical', detect_categorical_issues)
+    ]:
+        detected = detector(updated_df, columns=stale_columns)
+        for col, info in previous_issues.get(issue_type, {}).items():
+            if col in updated_df.columns and col not in stale_columns:
+                detected[col] = info
+        detected = {col: detected[col] for col in updated_df.columns if col in detected}
+        if detected:
+            issues[issue_type] = detected
+
     return issues
 
 def suggest_fixes(df, issues):
@@ -238,254 +428,508 @@ def suggest_fixes(df, issues):
         fixes['inconsistent_formats'] = {}
         for col, info in issues['inconsistent_formats'].items():
             if info['format_type'] == 'date':
+                # Formats to parse with, most frequent in the column first
+                input_formats = infer_input_formats(info['patterns'], info.get('day_first'))
                 fixes['inconsistent_formats'][col] = {
                     'options': [
-                        {'method': 'standardize_date_yyyy_mm_dd', 'format': '%Y-%m-%d', 'description': 'Standardize to YYYY-MM-DD format'},
-                        {'method': 'standardize_date_mm_dd_yyyy', 'format': '%m/%d/%Y', 'description': 'Standardize to MM/DD/YYYY format'},
+                        {'method': 'standardize_date_yyyy_mm_dd', 'format': '%Y-%m-%d', 'input_formats': input_formats, 'description': 'Standardize to YYYY-MM-DD format'},
+                        {'method': 'standardize_date_mm_dd_yyyy', 'format': '%m/%d/%Y', 'input_formats': input_formats, 'description': 'Standardize to MM/DD/YYYY format'},
                         {'method': 'none', 'description': 'Keep as is (no action)'}
                     ]
                 }
     
+    # Suggest fixes for categorical issues
+    if 'categorical' in issues:
+        fixes['categorical'] = {}
+        for col, info in issues['categorical'].items():
+            options = []
+            if info['variant_clusters']:
+                mapping = {
+                    variant: cluster['canonical']
+                    for cluster in info['variant_clusters']
+                    for variant in cluster['variants']
+                }
+                options.append({
+                    'method': 'merge_variants',
+                    'mapping': mapping,
+                    'description': f'Merge {len(mapping)} case/spacing variants into their most common spelling'
+                })
+            if info['rare_levels'] > 0:
+                options.append({
+                    'method': 'bucket_rare',
+                    'value': 'Other',
+                    'min_share': RARE_LEVEL_SHARE,
+                    'description': f'Group ~{info["rare_levels"]} rare levels (<{RARE_LEVEL_SHARE:.0%} of rows) into "Other"'
+                })
+            if info['id_like']:
+                options.append({
+                    'method': 'drop_column',
+                    'description': 'Drop ID-like column (nearly every value is unique)'
+                })
+            options.append({'method': 'none', 'description': 'Keep as is (no action)'})
+            fixes['categorical'][col] = {'options': options}
+    
     return fixes
 
-def apply_fixes(df, fixes):
+# Fix sections in the order apply_fixes has always logged them
+FIX_SECTIONS = ['missing_values', 'duplicates', 'outliers', 'inconsistent_formats', 'categorical']
+
+# Row-removing methods that need more than one column's fixed values.
+# Outlier removal only looks at its own column, so it runs with the
+# column-local fixes and hands back a row mask.
+ROW_FILTER_METHODS = {
+    'missing_values': {'drop'},
+    'duplicates': {'drop_first', 'drop_last'}
+}
+
+MAX_WORKERS = os.cpu_count() or 1
+
+def _fix_missing_values(series, col, method, selected_fix, source, knn_values):
     """
-    Apply the selected fixes to the dataframe.
+    Fill missing values of a single column. Counts refer to the input data.
     """
-    applied_fixes = []
-    df_copy = df.copy()
+    count = int(source[col].isna().sum())
     
-    # Apply fixes for missing values
-    if 'missing_values' in fixes:
-        for col, fix_info in fixes['missing_values'].items():
-            selected_fix = fix_info.get('selected')
-            if selected_fix:
-                method = selected_fix.get('method')
-                
-                if method == 'mean':
-                    df_copy[col] = df_copy[col].fillna(df_copy[col].mean())
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'missing_values',
-                        'fix_method': 'mean',
-                        'count': int(df[col].isna().sum())
-                    })
-                
-                elif method == 'median':
-                    df_copy[col] = df_copy[col].fillna(df_copy[col].median())
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'missing_values',
-                        'fix_method': 'median',
-                        'count': int(df[col].isna().sum())
-                    })
-                
-                elif method == 'mode':
-                    mode_value = df_copy[col].mode()[0] if not df_copy[col].mode().empty else None
-                    df_copy[col] = df_copy[col].fillna(mode_value)
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'missing_values',
-                        'fix_method': 'mode',
-                        'count': int(df[col].isna().sum())
-                    })
-                
-                elif method == 'constant':
-                    value = selected_fix.get('value', 'Unknown')
-                    df_copy[col] = df_copy[col].fillna(value)
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'missing_values',
-                        'fix_method': 'constant',
-                        'constant_value': value,
-                        'count': int(df[col].isna().sum())
-                    })
-                
-                elif method == 'knn':
-                    # Only apply KNN to numeric columns
-                    if pd.api.types.is_numeric_dtype(df_copy[col]):
-                        # Get numeric columns for KNN imputation
-                        numeric_cols = df_copy.select_dtypes(include=['number']).columns
-                        
-                        # Prepare data for KNN imputation
-                        X = df_copy[numeric_cols].copy()
-                        
-                        # Apply KNN imputation
-                        imputer = KNNImputer(n_neighbors=5)
-                        X_imputed = imputer.fit_transform(X)
-                        
-                        # Update the dataframe with imputed values
-                        for i, num_col in enumerate(numeric_cols):
-                            # Only update the target column
-                            if num_col == col:
-                                df_copy[col] = X_imputed[:, i]
-                        
-                        applied_fixes.append({
-                            'column': col,
-                            'issue_type': 'missing_values',
-                            'fix_method': 'knn',
-                            'count': int(df[col].isna().sum())
-                        })
-                
-                elif method == 'drop':
-                    df_copy = df_copy.dropna(subset=[col])
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'missing_values',
-                        'fix_method': 'drop',
-                        'count': int(df[col].isna().sum())
-                    })
-    
-    # Apply fixes for duplicates
-    if 'duplicates' in fixes and 'rows' in fixes['duplicates']:
-        fix_info = fixes['duplicates']['rows']
-        selected_fix = fix_info.get('selected')
-        
-        if selected_fix:
-            method = selected_fix.get('method')
-            
-            if method == 'drop_first':
-                dup_count = df_copy.duplicated().sum()
-                df_copy = df_copy.drop_duplicates(keep='first')
-                applied_fixes.append({
-                    'issue_type': 'duplicates',
-                    'fix_method': 'drop_first',
-                    'count': int(dup_count)
-                })
+    if method in ('mean', 'median', 'mode'):
+        # A fill value fitted on an earlier extract of the feed is reused
+        if 'fill_value' in selected_fix:
+            fill_value = selected_fix['fill_value']
+        elif method == 'mean':
+            fill_value = series.mean()
+        elif method == 'median':
+            fill_value = series.median()
+        else:
+            fill_value = series.mode()[0] if not series.mode().empty else None
+        if isinstance(fill_value, np.generic):
+            fill_value = fill_value.item()
+        series = series.fillna(fill_value)
+        return series, {
+            'column': col,
+            'issue_type': 'missing_values',
+            'fix_method': method,
+            'fill_value': fill_value,
+            'count': count
+        }
+    elif method == 'constant':
+        value = selected_fix.get('value', 'Unknown')
+        series = series.fillna(value)
+        return series, {
+            'column': col,
+            'issue_type': 'missing_values',
+            'fix_method': 'constant',
+            'constant_value': value,
+            'count': count
+        }
+    elif method == 'knn' and col in knn_values:
+        series = pd.Series(knn_values[col], index=series.index, name=col)
+    else:
+        return series, None
+    
+    return series, {
+        'column': col,
+        'issue_type': 'missing_values',
+        'fix_method': method,
+        'count': count
+    }
+
+def _fix_outliers(series, col, method, selected_fix):
+    """
+    Cap outliers of a single column, or work out which rows to keep for
+    the 'remove' method.
+    """
+    if not pd.api.types.is_numeric_dtype(series):
+        return series, None, None
+    
+    if method == 'cap':
+        if 'lower_bound' in selected_fix and 'upper_bound' in selected_fix:
+            # Bounds fitted on an earlier extract of the feed
+            lower_bound = selected_fix['lower_bound']
+            upper_bound = selected_fix['upper_bound']
+        else:
+            # Calculate IQR
+            Q1 = series.quantile(0.25)
+            Q3 = series.quantile(0.75)
+            IQR = Q3 - Q1
             
-            elif method == 'drop_last':
-                dup_count = df_copy.duplicated().sum()
-                df_copy = df_copy.drop_duplicates(keep='last')
-                applied_fixes.append({
-                    'issue_type': 'duplicates',
-                    'fix_method': 'drop_last',
-                    'count': int(dup_count)
-                })
+            # Define bounds
+            lower_bound = Q1 - 1.5 * IQR
+            upper_bound = Q3 + 1.5 * IQR
+        
+        # Count outliers
+        outliers_count = ((series < lower_bound) | (series > upper_bound)).sum()
+        
+        # Cap/floor values
+        series = series.clip(lower=lower_bound, upper=upper_bound)
+        
+        return series, None, {
+            'column': col,
+            'issue_type': 'outliers',
+            'fix_method': 'cap',
+            'lower_bound': float(lower_bound),
+            'upper_bound': float(upper_bound),
+            'count': int(outliers_count)
+        }
     
-    # Apply fixes for outliers
-    if 'outliers' in fixes:
-        for col, fix_info in fixes['outliers'].items():
-            selected_fix = fix_info.get('selected')
+    if method == 'remove':
+        from sklearn.ensemble import IsolationForest
+        
+        # Get condition for rows without outliers (using Isolation Forest)
+        X = series.dropna().values.reshape(-1, 1)
+        iso_forest = IsolationForest(contamination=0.1, random_state=42)
+        outliers_pred = iso_forest.fit_predict(X)
+        
+        # Keep only non-outlier rows; rows missing this value go as well
+        non_outlier_indices = series.dropna().index[outliers_pred == 1]
+        keep = series.index.isin(non_outlier_indices)
+        
+        return series, keep, {
+            'column': col,
+            'issue_type': 'outliers',
+            'fix_method': 'remove',
+            'count': int((~keep).sum())
+        }
+    
+    return series, None, None
+
+def _fix_inconsistent_formats(series, col, method, selected_fix):
+    """
+    Standardize the date format of a single column.
+    """
+    if method not in ('standardize_date_yyyy_mm_dd', 'standardize_date_mm_dd_yyyy'):
+        return series, None
+    
+    output_format = selected_fix.get('format')
+    
+    try:
+        # Parses each distinct value once; falls back to
+        # formats inferred from the column if none are given
+        series, converted_count = normalize_dates(
+            series,
+            output_format,
+            selected_fix.get('input_formats')
+        )
+    except Exception as e:
+        # Skip if format standardization fails
+        return series, None
+    
+    return series, {
+        'column': col,
+        'issue_type': 'inconsistent_formats',
+        'fix_method': method,
+        'format': output_format,
+        'count': converted_count
+    }
+
+def _fix_categorical(series, col, method, selected_fix):
+    """
+    Merge spelling variants or bucket rare levels of a single column.
+    """
+    if method == 'merge_variants':
+        mapping = selected_fix.get('mapping', {})
+        changed = series.isin(list(mapping))
+        series = series.copy()
+        series[changed] = series[changed].map(mapping)
+        return series, {
+            'column': col,
+            'issue_type': 'categorical',
+            'fix_method': 'merge_variants',
+            'count': int(changed.sum())
+        }
+    
+    if method == 'bucket_rare':
+        value = selected_fix.get('value', 'Other')
+        min_share = selected_fix.get('min_share', RARE_LEVEL_SHARE)
+        
+        if 'rare_levels' in selected_fix:
+            # Levels already found rare over the whole dataset
+            rare_mask = series.isin(selected_fix['rare_levels']).to_numpy()
+            rare_count = len(selected_fix['rare_levels'])
+        else:
+            # Exact level counts via integer codes rather than value_counts
+            codes, levels = pd.factorize(series)
+            level_counts = np.bincount(codes[codes >= 0], minlength=len(levels))
+            rare_codes = np.flatnonzero(level_counts < min_share * (codes >= 0).sum())
+            rare_mask = np.isin(codes, rare_codes)
+            rare_count = len(rare_codes)
+        
+        series = series.copy()
+        series[rare_mask] = value
+        return series, {
+            'column': col,
+            'issue_type': 'categorical',
+            'fix_method': 'bucket_rare',
+            'constant_value': value,
+            'levels': int(rare_count),
+            'count': int(rare_mask.sum())
+        }
+    
+    return series, None
+
+def _apply_column_fixes(df, col, steps, knn_values):
+    """
+    Run every column-local fix selected for one column, in section order.
+    
+    Returns the new column, a row mask if an outlier 'remove' fix applies,
+    and the applied-fix log entries keyed by step position.
+    """
+    series = df[col]
+    keep = None
+    entries = {}
+    
+    for position, section, selected_fix in steps:
+        method = selected_fix.get('method')
+        entry = None
+        
+        if section == 'missing_values':
+            series, entry = _fix_missing_values(series, col, method, selected_fix, df, knn_values)
+        elif section == 'outliers':
+            series, keep, entry = _fix_outliers(series, col, method, selected_fix)
+        elif section == 'inconsistent_formats':
+            series, entry = _fix_inconsistent_formats(series, col, method, selected_fix)
+        elif section == 'categorical':
+            series, entry = _fix_categorical(series, col, method, selected_fix)
+        
+        if entry is not None:
+            entries[position] = entry
+    
+    return series, keep, entries
+
+def _apply_column_block(df, block, knn_values):
+    return [(col, *_apply_column_fixes(df, col, steps, knn_values)) for col, steps in block]
+
+# Fixes that _apply_numeric_block runs with plain NumPy on float columns
+NUMERIC_BLOCK_METHODS = {
+    'missing_values': {'mean', 'median', 'constant'},
+    'outliers': {'cap'}
+}
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+def _is_numeric_block_column(series, steps):
+    """
+    Whether every fix selected for a column can run in _apply_numeric_block
+    without changing the column's dtype.
+    """
+    if series.dtype != np.float64:
+        return False
+    for _, section, selected_fix in steps:
+        method = selected_fix.get('method')
+        if method not in NUMERIC_BLOCK_METHODS.get(section, set()):
+            return False
+        if method == 'constant' and not _is_number(selected_fix.get('value', 'Unknown')):
+            return False
+        if 'fill_value' in selected_fix and not _is_number(selected_fix['fill_value']):
+            return False
+    return True
+
+def _apply_numeric_block(df, block):
+    """
+    Fill and IQR-cap a block of float columns with plain NumPy.
+    
+    Gives the same values and log entries as _apply_column_fixes, but each
+    step is a single NumPy call on a contiguous column (copy, partition,
+    where, clip), all of which release the GIL, so blocks on the thread
+    pool run on separate cores.
+    """
+    results = []
+    
+    for col, col_steps in block:
+        values = df[col].to_numpy(dtype=np.float64, copy=True)
+        missing = np.isnan(values)
+        valid = values[~missing]
+        entries = {}
+        
+        for position, section, selected_fix in col_steps:
+            method = selected_fix['method']
             
-            if selected_fix and pd.api.types.is_numeric_dtype(df_copy[col]):
-                method = selected_fix.get('method')
-                
-                if method == 'cap':
-                    # Calculate IQR
-                    Q1 = df_copy[col].quantile(0.25)
-                    Q3 = df_copy[col].quantile(0.75)
+            if section == 'missing_values':
+                if method == 'constant':
+                    fill_value = selected_fix.get('value', 'Unknown')
+                elif 'fill_value' in selected_fix:
+                    # A fill value fitted on an earlier extract of the feed is reused
+                    fill_value = selected_fix['fill_value']
+                elif not len(valid):
+                    fill_value = np.nan
+                elif method == 'mean':
+                    # Summed with the gaps as zeros, exactly like pandas' mean
+                    fill_value = np.where(missing, 0.0, values).sum() / len(valid)
+                else:
+                    fill_value = np.median(valid)
+                if isinstance(fill_value, np.generic):
+                    fill_value = fill_value.item()
+                np.copyto(values, fill_value, where=missing)
+                entries[position] = {
+                    'column': col,
+                    'issue_type': 'missing_values',
+                    'fix_method': method,
+                    'constant_value' if method == 'constant' else 'fill_value': fill_value,
+                    'count': int(missing.sum())
+                }
+                valid = values[~np.isnan(values)]
+            
+            elif section == 'outliers':
+                if 'lower_bound' in selected_fix and 'upper_bound' in selected_fix:
+                    # Bounds fitted on an earlier extract of the feed
+                    lower_bound = selected_fix['lower_bound']
+                    upper_bound = selected_fix['upper_bound']
+                elif len(valid):
+                    Q1, Q3 = np.quantile(valid, [0.25, 0.75])
                     IQR = Q3 - Q1
-                    
-                    # Define bounds
                     lower_bound = Q1 - 1.5 * IQR
                     upper_bound = Q3 + 1.5 * IQR
-                    
-                    # Count outliers
-                    outliers_count = ((df_copy[col] < lower_bound) | (df_copy[col] > upper_bound)).sum()
-                    
-                    # Cap/floor values
-                    df_copy[col] = df_copy[col].clip(lower=lower_bound, upper=upper_bound)
-                    
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'outliers',
-                        'fix_method': 'cap',
-                        'lower_bound': float(lower_bound),
-                        'upper_bound': float(upper_bound),
-                        'count': int(outliers_count)
-                    })
+                else:
+                    lower_bound = upper_bound = float('nan')
                 
-                elif method == 'remove':
-                    # Get condition for rows without outliers (using Isolation Forest)
-                    X = df_copy[col].dropna().values.reshape(-1, 1)
-                    iso_forest = IsolationForest(contamination=0.1, random_state=42)
-                    outliers_pred = iso_forest.fit_predict(X)
-                    
-                    # Get original index positions of non-outliers
-                    non_outlier_indices = df_copy[col].dropna().index[outliers_pred == 1]
-                    
-                    # Count outliers removed
-                    outliers_count = len(df_copy) - len(non_outlier_indices)
-                    
-                    # Keep only non-outlier rows
-                    df_copy = df_copy.loc[df_copy.index.isin(non_outlier_indices)]
-                    
-                    applied_fixes.append({
-                        'column': col,
-                        'issue_type': 'outliers',
-                        'fix_method': 'remove',
-                        'count': int(outliers_count)
-                    })
-    
-    # Apply fixes for inconsistent formats
-    if 'inconsistent_formats' in fixes:
-        for col, fix_info in fixes['inconsistent_formats'].items():
+                outliers_count = int(((values < lower_bound) | (values > upper_bound)).sum())
+                if len(valid):
+                    np.clip(values, lower_bound, upper_bound, out=values)
+                entries[position] = {
+                    'column': col,
+                    'issue_type': 'outliers',
+                    'fix_method': 'cap',
+                    'lower_bound': float(lower_bound),
+                    'upper_bound': float(upper_bound),
+                    'count': outliers_count
+                }
+        
+        results.append((col, pd.Series(values, index=df.index, name=col), None, entries))
+    
+    return results
+
+def apply_fixes(df, fixes, max_workers=MAX_WORKERS):
+    """
+    Apply the selected fixes to the dataframe.
+    
+    Column-local fixes (fills, caps, date and categorical cleanup) are
+    independent of each other, so columns are split into blocks and fixed
+    across a thread pool, all reading the input data. Float columns that
+    only need fills and caps go through _apply_numeric_block, whose NumPy
+    calls release the GIL; the rest are fixed with pandas. Row-removing fixes
+    only build masks, which are combined and applied once at the end; the
+    applied-fix log keeps the section and column order of the request.
+    """
+    # Flatten the request into ordered steps
+    steps = []
+    for section in FIX_SECTIONS:
+        for col, fix_info in fixes.get(section, {}).items():
             selected_fix = fix_info.get('selected')
-            
             if selected_fix:
-                method = selected_fix.get('method')
-                
-                if method == 'standardize_date_yyyy_mm_dd':
-                    output_format = selected_fix.get('format')
-                    
-                    try:
-                        # Make a copy of the current column state to parse from
-                        source_column_for_parsing = df_copy[col].copy()
-
-                        # This Series will store the datetime objects after successful parsing by any format.
-                        parsed_datetime_objects = pd.Series([pd.NaT] * len(df_copy), index=df_copy.index, dtype='datetime64[ns]')
-                        
-                        input_formats_to_try = ['%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y'] 
-
-                        for fmt in input_formats_to_try:
-                            current_format_parse_results = pd.to_datetime(source_column_for_parsing, format=fmt, errors='coerce')
-                            newly_parsed_mask = current_format_parse_results.notna() & parsed_datetime_objects.isna()
-                            parsed_datetime_objects.loc[newly_parsed_mask] = current_format_parse_results[newly_parsed_mask]
-
-                        successfully_converted_mask = parsed_datetime_objects.notna()
-                        
-                        if successfully_converted_mask.any():
-                             df_copy.loc[successfully_converted_mask, col] = parsed_datetime_objects[successfully_converted_mask].dt.strftime(output_format)
-                        
-                        applied_fixes.append({
-                            'column': col,
-                            'issue_type': 'inconsistent_formats',
-                            'fix_method': 'standardize_date_yyyy_mm_dd',
-                            'format': output_format
-                        })
-                    except Exception as e:
-                        # Skip if format standardization fails
-                        pass
-                elif method == 'standardize_date_mm_dd_yyyy':
-                    output_format = selected_fix.get('format')
-                    
-                    try:
-                        # Make a copy of the current column state to parse from
-                        source_column_for_parsing = df_copy[col].copy()
-
-                        # This Series will store the datetime objects after successful parsing by any format.
-                        parsed_datetime_objects = pd.Series([pd.NaT] * len(df_copy), index=df_copy.index, dtype='datetime64[ns]')
-                        
-                        input_formats_to_try = ['%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y']
-
-                        for fmt in input_formats_to_try:
-                            current_format_parse_results = pd.to_datetime(source_column_for_parsing, format=fmt, errors='coerce')
-                            newly_parsed_mask = current_format_parse_results.notna() & parsed_datetime_objects.isna()
-                            parsed_datetime_objects.loc[newly_parsed_mask] = current_format_parse_results[newly_parsed_mask]
-                        
-                        successfully_converted_mask = parsed_datetime_objects.notna()
-
-                        if successfully_converted_mask.any():
-                            df_copy.loc[successfully_converted_mask, col] = parsed_datetime_objects[successfully_converted_mask].dt.strftime(output_format)
-                        
-                        applied_fixes.append({
-                            'column': col,
-                            'issue_type': 'inconsistent_formats',
-                            'fix_method': 'standardize_date_mm_dd_yyyy',
-                            'format': output_format
-                        })
-                    except Exception as e:
-                        # Skip if format standardization fails
-                        pass
-    
-    return df_copy, applied_fixes 
\ No newline at end of file
+                steps.append((len(steps), section, col, selected_fix))
+    
+    column_steps = {}
+    row_steps = []
+    dropped_columns = []
+    for position, section, col, selected_fix in steps:
+        method = selected_fix.get('method')
+        if method in ROW_FILTER_METHODS.get(section, set()):
+            row_steps.append((position, section, col, selected_fix))
+        elif section == 'categorical' and method == 'drop_column':
+            dropped_columns.append((position, col))
+        elif col in df.columns:
+            column_steps.setdefault(col, []).append((position, section, selected_fix))
+    
+    # KNN uses every numeric column, so fit it once for all columns needing it
+    knn_values = {}
+    knn_cols = [
+        col for col, col_steps in column_steps.items()
+        if pd.api.types.is_numeric_dtype(df[col]) and any(
+            section == 'missing_values' and selected_fix.get('method') == 'knn'
+            for _, section, selected_fix in col_steps
+        )
+    ]
+    if knn_cols:
+        from sklearn.impute import KNNImputer
+        
+        numeric_cols = df.select_dtypes(include=['number']).columns
+        imputer = KNNImputer(n_neighbors=5)
+        X_imputed = imputer.fit_transform(df[numeric_cols])
+        # Columns that are entirely missing are dropped by the imputer
+        imputed_cols = [col for col in numeric_cols if df[col].notna().any()]
+        for i, num_col in enumerate(imputed_cols):
+            if num_col in knn_cols:
+                knn_values[num_col] = X_imputed[:, i]
+    
+    # Float columns with only fills and caps are fixed column by column on
+    # plain NumPy arrays, whose calls release the GIL; other columns go
+    # through pandas
+    numeric_steps = [
+        (col, col_steps) for col, col_steps in column_steps.items()
+        if _is_numeric_block_column(df[col], col_steps)
+    ]
+    numeric_cols = {col for col, _ in numeric_steps}
+    other_steps = [(col, col_steps) for col, col_steps in column_steps.items() if col not in numeric_cols]
+    
+    # Fix columns in parallel, one block of columns per task
+    block_size = max(1, -(-len(numeric_steps) // max_workers))
+    tasks = [
+        (_apply_numeric_block, (df, numeric_steps[i:i + block_size]))
+        for i in range(0, len(numeric_steps), block_size)
+    ] + [
+        (_apply_column_block, (df, other_steps[i::max_workers], knn_values))
+        for i in range(max_workers)
+        if other_steps[i::max_workers]
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        results = [
+            result
+            for block_results in executor.map(lambda task: task[0](*task[1]), tasks)
+            for result in block_results
+        ]
+    
+    fixed_columns = {}
+    entries = {}
+    keep = np.ones(len(df), dtype=bool)
+    for col, series, col_keep, col_entries in results:
+        fixed_columns[col] = series
+        if col_keep is not None:
+            keep &= col_keep
+        entries.update(col_entries)
+    
+    # Assemble the fixed frame in one go rather than column by column
+    df_copy = pd.DataFrame(
+        {col: fixed_columns.get(col, df[col]) for col in df.columns},
+        index=df.index
+    )
+    
+    # Missing value drops are decided on the input data
+    for position, section, col, selected_fix in row_steps:
+        if section == 'missing_values' and col in df.columns:
+            keep &= df[col].notna().to_numpy()
+            entries[position] = {
+                'column': col,
+                'issue_type': 'missing_values',
+                'fix_method': 'drop',
+                'count': int(df[col].isna().sum())
+            }
+    
+    # Duplicates are judged on fixed values among the rows still kept
+    for position, section, col, selected_fix in row_steps:
+        if section == 'duplicates' and col == 'rows':
+            method = selected_fix.get('method')
+            keep_which = 'first' if method == 'drop_first' else 'last'
+            duplicated = df_copy[keep].duplicated(keep=keep_which)
+            keep[np.flatnonzero(keep)[duplicated.to_numpy()]] = False
+            entries[position] = {
+                'issue_type': 'duplicates',
+                'fix_method': method,
+                'count': int(duplicated.sum())
+            }
+    
+    for position, col in dropped_columns:
+        if col in df_copy.columns:
+            df_copy = df_copy.drop(columns=[col])
+            entries[position] = {
+                'column': col,
+                'issue_type': 'categorical',
+                'fix_method': 'drop_column',
+                'count': int(keep.sum())
+            }
+    
+    # Apply all row filters at once
+    if not keep.all():
+        df_copy = df_copy[keep]
+    
+    applied_fixes = [entries[position] for position in sorted(entries)]
+    
+    return df_copy, applied_fixes
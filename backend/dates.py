@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+# Date patterns recognised by detection, most specific first
+DATE_PATTERNS = [
+    r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
+    r'\d{2}/\d{2}/\d{4}',  # MM/DD/YYYY
+    r'\d{2}-\d{2}-\d{4}'   # DD-MM-YYYY
+]
+
+def factorize_strings(series):
+    """
+    Factorize a column into integer codes, its distinct values, those values
+    as strings and the number of rows holding each of them.
+
+    Date columns have far fewer distinct values than rows, so all pattern
+    matching and parsing below works on the distinct values only. The
+    helpers below accept this result as `factorized`, so a column checked
+    several ways is only factorized once.
+    """
+    codes, uniques = pd.factorize(series)
+    unique_strings = pd.Series(uniques, dtype=object).astype(str)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return codes, uniques, unique_strings, counts
+
+def _match_patterns(unique_strings):
+    # Index into DATE_PATTERNS of the first pattern each value matches, or -1
+    matches = np.full(len(unique_strings), -1, dtype=np.int64)
+    for i, pattern in enumerate(DATE_PATTERNS):
+        mask = (matches == -1) & unique_strings.str.match(pattern).to_numpy(dtype=bool)
+        matches[mask] = i
+    return matches
+
+def _count_patterns(unique_strings, counts):
+    matches = _match_patterns(unique_strings)
+    found_patterns = {}
+    for i, pattern in enumerate(DATE_PATTERNS):
+        mask = matches == i
+        if mask.any():
+            found_patterns[pattern] = int(counts[mask].sum())
+    return found_patterns
+
+def _day_first(unique_strings, separator):
+    parts = unique_strings.str.extract(
+        rf'^(\d{{1,2}}){separator}(\d{{1,2}}){separator}\d{{4}}'
+    ).dropna().astype(int)
+
+    day_first = bool((parts[0] > 12).any())
+    month_first = bool((parts[1] > 12).any())
+    if day_first == month_first:
+        return None
+    return day_first
+
+def count_date_patterns(series, factorized=None):
+    """
+    Count how many non-missing values match each of DATE_PATTERNS.
+
+    Each value counts towards the first pattern it matches.
+    """
+    _, _, unique_strings, counts = factorized or factorize_strings(series)
+    return _count_patterns(unique_strings, counts)
+
+def match_date_patterns(series, factorized=None):
+    """
+    For every row, the index into DATE_PATTERNS of the first pattern its
+    value matches, or -1 for missing and non-matching values.
+    """
+    codes, _, unique_strings, _ = factorized or factorize_strings(series)
+    matches = _match_patterns(unique_strings)
+    return np.where(codes >= 0, matches[codes], -1)
+
+def detect_day_first(series, factorized=None):
+    """
+    Decide, per separator, whether `nn/nn/yyyy` and `nn-nn-yyyy` values put
+    the day first.
+
+    A separator maps to True if some leading part exceeds 12, False if some
+    middle part does, and None when the column never disambiguates (or
+    contradicts itself), in which case the default order applies.
+    """
+    _, _, unique_strings, _ = factorized or factorize_strings(series)
+    return {separator: _day_first(unique_strings, separator) for separator in ['/', '-']}
+
+def infer_input_formats(patterns, day_first=None):
+    """
+    Turn detected pattern counts into strftime formats, most frequent first.
+
+    Slash dates default to month first and dash dates to day first unless
+    day_first (as returned by detect_day_first) says otherwise.
+    """
+    day_first = day_first or {}
+    formats_by_pattern = dict(zip(DATE_PATTERNS, [
+        '%Y-%m-%d',
+        '%d/%m/%Y' if day_first.get('/') else '%m/%d/%Y',
+        '%m-%d-%Y' if day_first.get('-') is False else '%d-%m-%Y'
+    ]))
+
+    ordered = sorted(patterns.items(), key=lambda item: -item[1])
+    formats = [formats_by_pattern[pattern] for pattern, _ in ordered if pattern in formats_by_pattern]
+
+    # Keep the remaining formats as a fallback for unmatched values
+    formats += [fmt for fmt in formats_by_pattern.values() if fmt not in formats]
+    return formats
+
+def _infer_formats(unique_strings, counts):
+    return infer_input_formats(
+        _count_patterns(unique_strings, counts),
+        {separator: _day_first(unique_strings, separator) for separator in ['/', '-']}
+    )
+
+def infer_formats_from_counts(value_counts):
+    """
+    Input formats of a column from the number of rows holding each of its
+    distinct values (as returned by Series.value_counts), so they can be
+    inferred once from counts gathered chunk by chunk.
+    """
+    unique_strings = pd.Series(value_counts.index, dtype=object).astype(str)
+    return _infer_formats(unique_strings, value_counts.to_numpy())
+
+def normalize_dates(series, output_format, input_formats=None):
+    """
+    Rewrite every parseable date in the column using output_format.
+
+    Only the distinct values are parsed, trying input_formats in order
+    (inferred from the column when not given), and the results are mapped
+    back to the rows through the factorized codes. Values no format can
+    parse are left unchanged. Returns the new column and the number of rows
+    converted.
+    """
+    codes, uniques, unique_strings, counts = factorize_strings(series)
+    if len(uniques) == 0:
+        return series, 0
+
+    if input_formats is None:
+        input_formats = _infer_formats(unique_strings, counts)
+
+    parsed = pd.Series(pd.NaT, index=unique_strings.index, dtype='datetime64[ns]')
+    for fmt in input_formats:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(unique_strings[pending], format=fmt, errors='coerce')
+
+    converted = parsed.notna().to_numpy()
+    normalized = np.asarray(uniques, dtype=object).copy()
+    normalized[converted] = parsed[converted].dt.strftime(output_format).to_numpy()
+
+    values = np.where(codes >= 0, normalized[codes], series.to_numpy(dtype=object))
+    return pd.Series(values, index=series.index, name=series.name), int(counts[converted].sum())
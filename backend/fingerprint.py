@@ -0,0 +1,271 @@
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from categorical import analyze_categorical
+from storage import load_dataset
+
+FINGERPRINT_DIR = os.path.join(tempfile.gettempdir(), 'ml_data_prep_fingerprints')
+
+# Rows profiled per upload; the profile only needs shares and quantiles
+PROFILE_SAMPLE_ROWS = 100_000
+PROFILE_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Drift thresholds between two extracts of the same feed
+MAX_MISSING_SHIFT = 0.05       # Absolute change in the share of missing values
+MAX_MEDIAN_SHIFT = 0.5         # Median shift, in interquartile ranges
+MAX_SPREAD_RATIO = 2.0         # Growth or shrinkage of the interquartile range
+MAX_NEW_LEVEL_SHARE = 0.05     # Share of rows outside the previous common levels
+
+def _json_path(name):
+    return os.path.join(FINGERPRINT_DIR, f'{name}.json')
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, default=lambda o: o.item() if isinstance(o, np.generic) else str(o))
+    os.replace(tmp_path, path)
+
+def get_fingerprint_path(filepath):
+    """
+    Path of the fingerprint kept next to an uploaded dataset.
+    """
+    return os.path.splitext(filepath)[0] + '.fingerprint.json'
+
+def content_hash(filepath, chunk_size=1024 * 1024):
+    """
+    SHA-256 of the raw file bytes.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def schema_signature(df):
+    """
+    Hash of the column names and dtypes, shared by every extract of a feed.
+    """
+    schema = [[str(col), str(dtype)] for col, dtype in df.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()
+
+def profile_dataset(df, sample_rows=PROFILE_SAMPLE_ROWS):
+    """
+    Small per-column profile used for drift checks: exact missing shares,
+    plus quantiles (numeric columns) or a sketch of the common levels
+    (text columns) taken from a fixed-size sample of rows.
+    """
+    sample = df.sample(n=sample_rows, random_state=0) if len(df) > sample_rows else df
+    profile = {}
+    for col in df.columns:
+        column_profile = {'missing_share': float(df[col].isna().mean()) if len(df) else 0.0}
+        values = sample[col].dropna()
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            column_profile['quantiles'] = (
+                [float(q) for q in np.quantile(values.to_numpy(dtype=float), PROFILE_QUANTILES)]
+                if len(values) else None
+            )
+        elif values.dtype == 'object':
+            analysis = analyze_categorical(values)
+            column_profile['common_values'] = [str(value) for value in analysis['common_values']]
+            column_profile['distinct_share'] = analysis['distinct_estimate'] / max(1, analysis['rows'])
+        profile[str(col)] = column_profile
+    return profile
+
+def _new_level_share(series, common_values):
+    values = series.dropna()
+    if not len(values):
+        return 0.0
+    return float((~values.astype(str).isin(common_values)).mean())
+
+def check_drift(previous_profile, profile, df=None):
+    """
+    Compare the profile of a new extract with the previous one.
+
+    Returns {column: [reasons]} for the columns whose distribution moved
+    beyond the drift thresholds. When df is given, the share of rows
+    outside the previous common levels is measured on the new data.
+    """
+    drift = {}
+    for col, current in profile.items():
+        previous = previous_profile.get(col)
+        if previous is None:
+            continue
+        reasons = []
+
+        if abs(current['missing_share'] - previous['missing_share']) > MAX_MISSING_SHIFT:
+            reasons.append(
+                f"missing share moved from {previous['missing_share']:.1%} to {current['missing_share']:.1%}"
+            )
+
+        if current.get('quantiles') and previous.get('quantiles'):
+            _, q1, median, q3, _ = previous['quantiles']
+            _, new_q1, new_median, new_q3, _ = current['quantiles']
+            iqr, new_iqr = q3 - q1, new_q3 - new_q1
+            if iqr > 0 and abs(new_median - median) > MAX_MEDIAN_SHIFT * iqr:
+                reasons.append(f'median moved from {median:g} to {new_median:g}')
+            if iqr > 0 and new_iqr > 0 and not 1 / MAX_SPREAD_RATIO <= new_iqr / iqr <= MAX_SPREAD_RATIO:
+                reasons.append(f'interquartile range changed from {iqr:g} to {new_iqr:g}')
+
+        if 'common_values' in previous and 'common_values' in current:
+            if df is not None:
+                new_share = _new_level_share(df[col], previous['common_values'])
+            else:
+                new_share = len(set(current['common_values']) - set(previous['common_values'])) / max(1, len(current['common_values']))
+            if new_share > MAX_NEW_LEVEL_SHARE:
+                reasons.append(f'{new_share:.1%} of values fall outside the previous common levels')
+
+        if reasons:
+            drift[col] = reasons
+    return drift
+
+def compute_fingerprint(filepath, df=None):
+    """
+    Fingerprint a dataset and match it against the last uploaded extract
+    with the same schema, without writing anything.
+
+    match is 'identical' for a byte-identical file, 'schema' when only the
+    schema matches (drift then lists the columns that moved) and None for
+    a new feed.
+    """
+    if df is None:
+        df = load_dataset(filepath)
+
+    fingerprint = {
+        'content_hash': content_hash(filepath),
+        'schema': schema_signature(df),
+        'source_mtime': os.path.getmtime(filepath),
+        'profile': profile_dataset(df)
+    }
+
+    feed = _read_json(_json_path(f"feed_{fingerprint['schema']}"))
+    if feed is None:
+        fingerprint['match'] = None
+        fingerprint['drift'] = {}
+    elif feed['content_hash'] == fingerprint['content_hash']:
+        fingerprint['match'] = 'identical'
+        fingerprint['drift'] = {}
+    else:
+        fingerprint['match'] = 'schema'
+        fingerprint['drift'] = check_drift(feed['profile'], fingerprint['profile'], df)
+    return fingerprint
+
+def fingerprint_upload(filepath, df=None):
+    """
+    Fingerprint an uploaded dataset, store the fingerprint next to it and
+    make it the feed's latest extract, keeping the feed's saved fix
+    selections. Only uploads move the feed baseline.
+    """
+    fingerprint = compute_fingerprint(filepath, df)
+    feed = _read_json(_json_path(f"feed_{fingerprint['schema']}")) or {'selections': {}}
+
+    _write_json(get_fingerprint_path(filepath), fingerprint)
+    _write_json(_json_path(f"feed_{fingerprint['schema']}"), dict(
+        feed,
+        content_hash=fingerprint['content_hash'],
+        profile=fingerprint['profile'],
+        updated=datetime.now().isoformat(timespec='seconds')
+    ))
+    return fingerprint
+
+def load_fingerprint(filepath):
+    """
+    Stored fingerprint of a dataset, computed again (leaving the feed
+    alone) if there is none or the file changed since.
+    """
+    fingerprint = _read_json(get_fingerprint_path(filepath))
+    if fingerprint is None or fingerprint['source_mtime'] != os.path.getmtime(filepath):
+        fingerprint = compute_fingerprint(filepath)
+        _write_json(get_fingerprint_path(filepath), fingerprint)
+    return fingerprint
+
+def summarize_fingerprint(fingerprint):
+    """
+    Fingerprint fields returned to the client (the profile is left out).
+    """
+    return {
+        'content_hash': fingerprint['content_hash'],
+        'schema': fingerprint['schema'],
+        'match': fingerprint['match'],
+        'drift': fingerprint['drift']
+    }
+
+def _request_key(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def get_cached_result(fingerprint, operation, request=None):
+    """
+    Result of operation ('detect_issues' or 'suggest_fixes') stored for a
+    byte-identical file and the same request, or None.
+    """
+    results = _read_json(_json_path(f"content_{fingerprint['content_hash']}")) or {}
+    return results.get(operation, {}).get(_request_key(request))
+
+def store_result(fingerprint, operation, result, request=None):
+    path = _json_path(f"content_{fingerprint['content_hash']}")
+    results = _read_json(path) or {}
+    results.setdefault(operation, {})[_request_key(request)] = result
+    _write_json(path, results)
+
+# Fitted parameters of each applied fix that are replayed on later extracts
+FITTED_PARAMETERS = ['fill_value', 'lower_bound', 'upper_bound']
+
+def record_selections(fingerprint, fixes, applied_fixes):
+    """
+    Save the fix selections applied to an extract, together with the
+    parameters fitted on it, as the defaults for the feed.
+    """
+    fitted = {
+        (entry['issue_type'], entry['column']): {
+            key: entry[key] for key in FITTED_PARAMETERS if key in entry
+        }
+        for entry in applied_fixes
+        if 'column' in entry
+    }
+
+    path = _json_path(f"feed_{fingerprint['schema']}")
+    feed = _read_json(path)
+    # Only selections made on the feed's latest upload become its defaults
+    if feed is None or feed['content_hash'] != fingerprint['content_hash']:
+        return
+    for section, section_fixes in fixes.items():
+        for col, fix_info in section_fixes.items():
+            selected_fix = fix_info.get('selected')
+            if selected_fix:
+                feed['selections'].setdefault(section, {})[col] = dict(
+                    selected_fix, **fitted.get((section, col), {})
+                )
+    _write_json(path, feed)
+
+def reuse_selections(fingerprint, fixes):
+    """
+    Pre-select the fixes chosen for earlier extracts of the same feed.
+
+    Selections are reused, fitted parameters included, for columns that
+    did not drift; drifted columns are flagged with the reasons and keep
+    fresh suggestions so their parameters are fitted again.
+    """
+    if fingerprint['match'] is None:
+        return fixes
+    feed = _read_json(_json_path(f"feed_{fingerprint['schema']}")) or {'selections': {}}
+
+    for section, section_fixes in fixes.items():
+        for col, fix_info in section_fixes.items():
+            if col in fingerprint['drift']:
+                fix_info['drift'] = fingerprint['drift'][col]
+                continue
+            selected_fix = feed['selections'].get(section, {}).get(col)
+            if selected_fix and any(option['method'] == selected_fix.get('method') for option in fix_info['options']):
+                fix_info['selected'] = selected_fix
+    return fixes
@@ -0,0 +1,8 @@
+import gc
+
+def when_ready(server):
+    # The master has imported the app (with --preload) and is about to fork.
+    # Freezing moves those objects out of the collector's reach, so that
+    # collections in the workers do not write to, and thereby copy, the
+    # pages they share with the master.
+    gc.freeze()
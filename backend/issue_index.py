@@ -0,0 +1,136 @@
+import os
+import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from storage import load_dataset, load_table
+from data_processor import detect_issues
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Filter operators accepted by query_issue_rows
+FILTER_OPERATORS = {
+    'eq': pc.equal,
+    'ne': pc.not_equal,
+    'lt': pc.less,
+    'le': pc.less_equal,
+    'gt': pc.greater,
+    'ge': pc.greater_equal,
+    'contains': lambda values, value: pc.match_substring(values, str(value)),
+    'is_null': lambda values, value: pc.is_null(values),
+    'not_null': lambda values, value: pc.is_valid(values)
+}
+
+def get_index_path(filepath):
+    """
+    Path of the per-issue row index kept next to a dataset.
+    """
+    return os.path.splitext(filepath)[0] + '.issue_index.npz'
+
+def save_issue_index(filepath, issue_rows):
+    """
+    Store the offending row positions of every issue, keyed by
+    (issue type, column), as one .npz archive.
+    """
+    index_path = get_index_path(filepath)
+    tmp_path = f'{index_path}.{os.getpid()}.tmp.npz'
+
+    keys = list(issue_rows)
+    arrays = {f'rows_{i}': np.asarray(issue_rows[key], dtype=np.int64) for i, key in enumerate(keys)}
+    arrays['keys'] = np.array(json.dumps([list(key) for key in keys]))
+
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+def build_issue_index(filepath, df=None):
+    """
+    Run detection once while recording offending rows, and store the index.
+    """
+    if df is None:
+        df = load_dataset(filepath)
+    issue_rows = {}
+    issues = detect_issues(df, rows=issue_rows)
+    save_issue_index(filepath, issue_rows)
+    return issues
+
+def index_is_fresh(filepath):
+    """
+    Whether the row index of a dataset exists and is newer than it.
+    """
+    index_path = get_index_path(filepath)
+    return os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(filepath)
+
+def load_issue_rows(filepath, issue_type, column):
+    """
+    Row positions of one issue, building the index first if it is missing
+    or older than the dataset. Returns None if the issue does not exist.
+    """
+    index_path = get_index_path(filepath)
+    if not index_is_fresh(filepath):
+        build_issue_index(filepath)
+
+    # Members of an .npz archive are only read when accessed
+    with np.load(index_path) as index:
+        keys = [tuple(key) for key in json.loads(str(index['keys']))]
+        if (issue_type, column) not in keys:
+            return None
+        return index[f'rows_{keys.index((issue_type, column))}']
+
+def query_issue_rows(filepath, issue_type, column, cursor=None, limit=DEFAULT_PAGE_SIZE,
+                     filters=None, sort_by=None, descending=False):
+    """
+    Return one page of the rows behind an issue.
+
+    Only the indexed rows are touched: filter and sort columns are gathered
+    for those positions from the memory mapped Arrow table, and full rows
+    are materialized for the requested page alone. The cursor is the offset
+    into the filtered, sorted row list returned as next_cursor by the
+    previous page.
+
+    filters is a list of {'column', 'op', 'value'} dicts with op one of
+    FILTER_OPERATORS. Raises KeyError for unknown issues or columns and
+    ValueError for invalid arguments.
+    """
+    positions = load_issue_rows(filepath, issue_type, column)
+    if positions is None:
+        raise KeyError(f'No issue {issue_type!r} for column {column!r}')
+
+    offset = int(cursor) if cursor else 0
+    limit = int(limit)
+    if offset < 0 or limit <= 0:
+        raise ValueError('cursor and limit must be positive')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    table = load_table(filepath)
+
+    for row_filter in filters or []:
+        op = row_filter.get('op', 'eq')
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f'Unknown filter operator {op!r}')
+        values = table.column(row_filter['column']).take(pa.array(positions))
+        try:
+            mask = FILTER_OPERATORS[op](values, row_filter.get('value'))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+            raise ValueError(f"Cannot filter {row_filter['column']!r}: {e}")
+        positions = positions[pc.fill_null(mask, False).to_numpy(zero_copy_only=False)]
+
+    if sort_by:
+        values = table.column(sort_by).take(pa.array(positions))
+        order = pc.array_sort_indices(values, order='descending' if descending else 'ascending')
+        positions = positions[order.to_numpy()]
+
+    page = positions[offset:offset + limit]
+    rows = table.take(pa.array(page)).to_pylist()
+    for position, row in zip(page, rows):
+        row['_row'] = int(position)
+
+    next_offset = offset + limit
+    return {
+        'issue_type': issue_type,
+        'column': column,
+        'total': int(len(positions)),
+        'rows': rows,
+        'next_cursor': str(next_offset) if next_offset < len(positions) else None
+    }
@@ -0,0 +1,389 @@
+import os
+import sys
+import json
+import math
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from sketches import QuantileSketch
+from dates import infer_formats_from_counts
+from storage import iter_chunks, dataset_shape
+from data_processor import FIX_SECTIONS, ROW_FILTER_METHODS, RARE_LEVEL_SHARE, _apply_column_fixes
+
+CHUNK_ROWS = 100_000
+
+# Each spill partition should fit comfortably in memory on its own
+PARTITION_BYTES = 64 * 1024 * 1024
+MAX_PARTITIONS = 256
+BYTES_PER_CELL = 16
+
+# Fixes whose model is fitted on the whole dataset at once
+UNSUPPORTED_METHODS = {
+    'missing_values': {'knn'},
+    'outliers': {'remove'}
+}
+
+def _needs_fit(section, selected_fix):
+    # Steps whose parameters depend on the whole column
+    method = selected_fix.get('method')
+    if section == 'missing_values' and method in ('mean', 'median', 'mode'):
+        return 'fill_value' not in selected_fix
+    if section == 'outliers' and method == 'cap':
+        return 'lower_bound' not in selected_fix
+    if section == 'categorical' and method == 'bucket_rare':
+        return 'rare_levels' not in selected_fix
+    if section == 'inconsistent_formats' and method in ('standardize_date_yyyy_mm_dd', 'standardize_date_mm_dd_yyyy'):
+        # Chunks would each guess the day/month order on their own
+        return 'input_formats' not in selected_fix
+    return False
+
+def _prefix_values(filepath, column_steps, depth, chunk_size):
+    """
+    Yield, per chunk, {col: values} with the first depth[col] fixes of each
+    column applied.
+    """
+    for chunk in iter_chunks(filepath, chunk_size):
+        yield {
+            col: _apply_column_fixes(chunk, col, column_steps[col][:steps], {})[0]
+            for col, steps in depth.items()
+        }
+
+def exact_quantiles(batches, targets, width=None):
+    """
+    Refine sketch estimates into exact quantiles, interpolated the way
+    pandas does, with one more pass over the values.
+
+    batches() yields {col: series} dicts and may be called repeatedly;
+    targets maps col -> (sketch, quantiles). Only the values between two
+    sketch estimates bracketing each quantile are kept, so memory is about
+    2 * width of the column. A bracket that missed is widened and the
+    pass repeated.
+    """
+    results = {}
+    remaining = {}
+    for col, (sketch, qs) in targets.items():
+        if sketch.count == 0:
+            results[col] = [np.nan] * len(qs)
+        else:
+            remaining[col] = (sketch, np.asarray(qs, dtype=float))
+    if width is None and targets:
+        width = 4 / max(sketch.k for sketch, _ in targets.values())
+
+    while remaining:
+        brackets = {}
+        for col, (sketch, qs) in remaining.items():
+            lower = np.where(qs - width <= 0, -np.inf, sketch.quantile(np.clip(qs - width, 0, 1)))
+            upper = np.where(qs + width >= 1, np.inf, sketch.quantile(np.clip(qs + width, 0, 1)))
+            brackets[col] = (lower, upper, np.zeros(len(qs), dtype=np.int64), [[] for _ in qs])
+
+        for values in batches():
+            for col, (lower, upper, below, inside) in brackets.items():
+                x = values[col].to_numpy(dtype=float)
+                x = x[~np.isnan(x)]
+                for j in range(len(lower)):
+                    below[j] += np.count_nonzero(x < lower[j])
+                    inside[j].append(x[(x >= lower[j]) & (x <= upper[j])])
+
+        for col, (lower, upper, below, inside) in brackets.items():
+            sketch, qs = remaining[col]
+            found = []
+            for j, q in enumerate(qs):
+                x = np.sort(np.concatenate(inside[j]))
+                h = (sketch.count - 1) * q
+                low, high = int(math.floor(h)) - below[j], int(math.ceil(h)) - below[j]
+                if low < 0 or high >= len(x):
+                    break
+                found.append(float(x[low] + (h - math.floor(h)) * (x[high] - x[low])))
+            else:
+                results[col] = found
+                del remaining[col]
+        width *= 4
+
+    return results
+
+def _fit_steps(filepath, column_steps, chunk_size, exact):
+    """
+    Fit the parameters of every fix that depends on the whole column.
+
+    Each round streams the file once and fits the earliest unfitted fix of
+    every column on its values after the fixes before it, just as
+    apply_fixes would see them: running sums for means, exact per-level
+    counts for modes, rare levels and date formats, quantile sketches for
+    medians and cap bounds (plus an exact refinement pass unless exact is
+    False).
+    """
+    while True:
+        pending = {}
+        for col, steps in column_steps.items():
+            for i, (position, section, selected_fix) in enumerate(steps):
+                if _needs_fit(section, selected_fix):
+                    pending[col] = i
+                    break
+        if not pending:
+            return column_steps
+
+        stats = {col: {'sum': 0.0, 'count': 0, 'sketch': QuantileSketch(), 'levels': None, 'numeric': True} for col in pending}
+        for values in _prefix_values(filepath, column_steps, pending, chunk_size):
+            for col, series in values.items():
+                method = column_steps[col][pending[col]][2]['method']
+                col_stats = stats[col]
+                if method == 'mean':
+                    col_stats['sum'] += float(series.sum())
+                    col_stats['count'] += int(series.count())
+                elif method in ('median', 'cap'):
+                    if pd.api.types.is_numeric_dtype(series):
+                        col_stats['sketch'].update(series.to_numpy(dtype=float))
+                    else:
+                        col_stats['numeric'] = False
+                else:
+                    counts = series.value_counts()
+                    col_stats['levels'] = counts if col_stats['levels'] is None else col_stats['levels'].add(counts, fill_value=0)
+
+        targets = {}
+        for col, i in pending.items():
+            method = column_steps[col][i][2]['method']
+            if method == 'median':
+                targets[col] = (stats[col]['sketch'], [0.5])
+            elif method == 'cap' and stats[col]['numeric']:
+                targets[col] = (stats[col]['sketch'], [0.25, 0.75])
+        if exact:
+            quantiles = exact_quantiles(
+                lambda: _prefix_values(filepath, column_steps, {col: pending[col] for col in targets}, chunk_size),
+                targets
+            )
+        else:
+            quantiles = {col: [float(q) for q in sketch.quantile(np.asarray(qs))] for col, (sketch, qs) in targets.items()}
+
+        for col, i in pending.items():
+            position, section, selected_fix = column_steps[col][i]
+            method = selected_fix['method']
+            col_stats = stats[col]
+
+            if method == 'cap' and not col_stats['numeric']:
+                # Text columns are never capped
+                del column_steps[col][i]
+                continue
+
+            if method == 'mean':
+                fitted = {'fill_value': col_stats['sum'] / col_stats['count'] if col_stats['count'] else np.nan}
+            elif method == 'median':
+                fitted = {'fill_value': quantiles[col][0]}
+            elif method == 'cap':
+                q1, q3 = quantiles[col]
+                fitted = {'lower_bound': q1 - 1.5 * (q3 - q1), 'upper_bound': q3 + 1.5 * (q3 - q1)}
+            elif section == 'inconsistent_formats':
+                levels = col_stats['levels'] if col_stats['levels'] is not None else pd.Series(dtype=np.int64)
+                fitted = {'input_formats': infer_formats_from_counts(levels)}
+            elif method == 'mode':
+                levels = col_stats['levels']
+                if levels is None or levels.empty:
+                    fitted = {'fill_value': None}
+                else:
+                    # Ties go to the smallest value, as with Series.mode
+                    modes = levels[levels == levels.max()].index
+                    try:
+                        modes = modes.sort_values()
+                    except TypeError:
+                        pass
+                    fitted = {'fill_value': modes[0]}
+            else:
+                levels = col_stats['levels'] if col_stats['levels'] is not None else pd.Series(dtype=np.int64)
+                min_share = selected_fix.get('min_share', RARE_LEVEL_SHARE)
+                fitted = {'rare_levels': levels.index[levels < min_share * levels.sum()].tolist()}
+
+            column_steps[col][i] = (position, section, dict(selected_fix, **fitted))
+
+def _as_float(value):
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return float(value)
+    return value
+
+def _hash_ready(frame):
+    # Numbers become floats whatever dtype a chunk was read as, so the same
+    # value matches across chunks; text stays text, so 1 and '1' differ as
+    # they do in apply_fixes
+    return pd.DataFrame({
+        i: frame[col].astype(float) if pd.api.types.is_numeric_dtype(frame[col]) and not pd.api.types.is_bool_dtype(frame[col])
+        else frame[col].astype(object).map(_as_float).where(frame[col].notna(), None)
+        for i, col in enumerate(frame.columns)
+    })
+
+def _spill_partitions(partition_files, frame, positions):
+    """
+    Append rows to hash partitions, so that identical rows always land in
+    the same partition.
+    """
+    frame = _hash_ready(frame)
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    partition = hashes % np.uint64(len(partition_files))
+    frame['_position'] = positions
+    for p in np.unique(partition):
+        pickle.dump(frame[partition == p], partition_files[p], protocol=pickle.HIGHEST_PROTOCOL)
+
+def _partition_duplicates(path, keep):
+    # Rows were appended in file order, so positions are already sorted
+    frames = []
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                frames.append(pickle.load(f))
+            except EOFError:
+                break
+    if not frames:
+        return np.array([], dtype=np.int64)
+    partition = pd.concat(frames, ignore_index=True)
+    duplicated = partition.drop(columns='_position').duplicated(keep=keep)
+    return partition['_position'].to_numpy()[duplicated.to_numpy()]
+
+def _add_entries(totals, entries):
+    # Sum the per-chunk counts of each applied fix
+    for position, entry in entries.items():
+        if position in totals:
+            totals[position]['count'] += entry['count']
+        else:
+            totals[position] = dict(entry)
+
+def _write_chunk(frame, output_path, first):
+    frame.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+
+def apply_fixes_out_of_core(filepath, output_path, fixes, chunk_size=CHUNK_ROWS, exact=True, spill_dir=None):
+    """
+    Apply the selected fixes to a dataset too large for memory, streaming
+    it in chunks and writing the cleaned CSV to output_path. Returns the
+    applied-fix log in the same form as apply_fixes.
+
+    Fixes that need whole-column statistics are fitted first (see
+    _fit_steps) and then applied chunk by chunk. Duplicates are found by
+    spilling the fixed rows to hash partitions on local disk: identical
+    rows share a partition, so each partition is deduplicated on its own
+    and memory is bounded by the chunk and partition sizes. KNN imputation
+    and outlier removal fit a model on the whole dataset and raise
+    ValueError.
+    """
+    # Flatten the request into ordered steps, as apply_fixes does
+    steps = []
+    for section in FIX_SECTIONS:
+        for col, fix_info in fixes.get(section, {}).items():
+            selected_fix = fix_info.get('selected')
+            if selected_fix:
+                if selected_fix.get('method') in UNSUPPORTED_METHODS.get(section, set()):
+                    raise ValueError(f"'{selected_fix['method']}' needs the whole dataset in memory")
+                steps.append((len(steps), section, col, selected_fix))
+
+    # Column names from the first chunk
+    dataset_columns = set(next(iter_chunks(filepath, chunk_size), pd.DataFrame()).columns)
+
+    column_steps = {}
+    row_steps = []
+    dropped_columns = []
+    for position, section, col, selected_fix in steps:
+        method = selected_fix.get('method')
+        if method in ROW_FILTER_METHODS.get(section, set()):
+            row_steps.append((position, section, col, selected_fix))
+        elif section == 'categorical' and method == 'drop_column':
+            if col in dataset_columns:
+                dropped_columns.append((position, col))
+        elif col in dataset_columns:
+            column_steps.setdefault(col, []).append((position, section, selected_fix))
+
+    column_steps = _fit_steps(filepath, column_steps, chunk_size, exact)
+    dedup_step = next((step for step in row_steps if step[1] == 'duplicates' and step[2] == 'rows'), None)
+
+    rows, columns = dataset_shape(filepath)
+    partitions = min(MAX_PARTITIONS, max(1, math.ceil(rows * columns * BYTES_PER_CELL / PARTITION_BYTES)))
+    work_dir = tempfile.mkdtemp(prefix='out_of_core_', dir=spill_dir)
+
+    try:
+        partition_files = [
+            open(os.path.join(work_dir, f'partition_{p}.pkl'), 'wb') for p in range(partitions)
+        ] if dedup_step else []
+        totals = {}
+        offset = 0
+        chunk_count = 0
+        kept_rows = 0
+        first = True
+
+        for chunk in iter_chunks(filepath, chunk_size):
+            positions = np.arange(offset, offset + len(chunk))
+            offset += len(chunk)
+
+            fixed = {}
+            for col, col_steps in column_steps.items():
+                if col in chunk.columns:
+                    fixed[col], _, entries = _apply_column_fixes(chunk, col, col_steps, {})
+                    _add_entries(totals, entries)
+            fixed_chunk = pd.DataFrame({col: fixed.get(col, chunk[col]) for col in chunk.columns}, index=chunk.index)
+
+            # Missing value drops are decided on the input data
+            keep = np.ones(len(chunk), dtype=bool)
+            for position, section, col, selected_fix in row_steps:
+                if section == 'missing_values' and col in chunk.columns:
+                    missing = chunk[col].isna().to_numpy()
+                    keep &= ~missing
+                    _add_entries(totals, {position: {
+                        'column': col,
+                        'issue_type': 'missing_values',
+                        'fix_method': 'drop',
+                        'count': int(missing.sum())
+                    }})
+            fixed_chunk = fixed_chunk[keep]
+            positions = positions[keep]
+
+            if dedup_step:
+                # Duplicates are judged on fixed values among the rows kept
+                _spill_partitions(partition_files, fixed_chunk, positions)
+                with open(os.path.join(work_dir, f'chunk_{chunk_count}.pkl'), 'wb') as f:
+                    pickle.dump((fixed_chunk, positions), f, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                _write_chunk(fixed_chunk.drop(columns=[col for _, col in dropped_columns if col in fixed_chunk.columns]), output_path, first)
+                first = False
+                kept_rows += len(fixed_chunk)
+            chunk_count += 1
+
+        if dedup_step:
+            for partition_file in partition_files:
+                partition_file.close()
+
+            method = dedup_step[3].get('method')
+            keep_which = 'first' if method == 'drop_first' else 'last'
+            duplicates = np.sort(np.concatenate([
+                _partition_duplicates(partition_file.name, keep_which) for partition_file in partition_files
+            ] + [np.array([], dtype=np.int64)]))
+            totals[dedup_step[0]] = {
+                'issue_type': 'duplicates',
+                'fix_method': method,
+                'count': int(len(duplicates))
+            }
+
+            for i in range(chunk_count):
+                with open(os.path.join(work_dir, f'chunk_{i}.pkl'), 'rb') as f:
+                    fixed_chunk, positions = pickle.load(f)
+                fixed_chunk = fixed_chunk[~np.isin(positions, duplicates, assume_unique=True)]
+                _write_chunk(fixed_chunk.drop(columns=[col for _, col in dropped_columns if col in fixed_chunk.columns]), output_path, first)
+                first = False
+                kept_rows += len(fixed_chunk)
+
+        if first:
+            open(output_path, 'w').close()
+
+        for position, col in dropped_columns:
+            totals[position] = {
+                'column': col,
+                'issue_type': 'categorical',
+                'fix_method': 'drop_column',
+                'count': kept_rows
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return [totals[position] for position in sorted(totals)]
+
+if __name__ == '__main__':
+    # python out_of_core.py data.csv fixes.json cleaned.csv
+    if len(sys.argv) != 4:
+        sys.exit('usage: python out_of_core.py <input> <fixes.json> <output.csv>')
+    with open(sys.argv[2]) as f:
+        applied = apply_fixes_out_of_core(sys.argv[1], sys.argv[3], json.load(f))
+    print(json.dumps(applied, indent=2, default=str))
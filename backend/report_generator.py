@@ -1,48 +1,40 @@
-import pandas as pd
 import os
 import tempfile
 from datetime import datetime
 import json
+from storage import load_dataset
+from correlations import profile_correlations
 
-def generate_report(original_filepath, cleaned_filepath, applied_fixes):
+def generate_report(original_filepath, cleaned_filepath, applied_fixes, metrics=None, correlations=None):
     """
     Generate a PDF report summarizing the data quality issues and fixes.
     
     For the MVP, we'll create a simple HTML report instead of a PDF,
     which can be rendered in the browser.
-    """
-    # Read the original and cleaned data
-    original_df = pd.read_csv(original_filepath)
-    cleaned_df = pd.read_csv(cleaned_filepath)
     
+    If metrics (as returned by version_store.version_metrics) are given,
+    they are used instead of reading and comparing both files. Likewise
+    correlations (as returned by correlations.profile_correlations) are
+    computed from the cleaned file unless given.
+    """
     # Create a temporary file for the report
     report_dir = tempfile.gettempdir()
     report_filename = f"data_quality_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
     report_path = os.path.join(report_dir, report_filename)
     
-    # Calculate data quality metrics
-    original_rows = len(original_df)
-    cleaned_rows = len(cleaned_df)
-    
-    # Count missing values before and after
-    original_missing = original_df.isna().sum().sum()
-    cleaned_missing = cleaned_df.isna().sum().sum()
+    if metrics is None:
+        metrics = compare_datasets(original_filepath, cleaned_filepath)
     
-    # Count duplicates before and after
-    original_duplicates = original_df.duplicated().sum()
-    cleaned_duplicates = cleaned_df.duplicated().sum()
+    if correlations is None:
+        correlations = profile_correlations(load_dataset(cleaned_filepath))
     
     # Generate summary statistics
-    summary = {
-        "original_rows": original_rows,
-        "cleaned_rows": cleaned_rows,
-        "rows_removed": original_rows - cleaned_rows,
-        "original_missing_values": int(original_missing),
-        "cleaned_missing_values": int(cleaned_missing),
-        "original_duplicates": int(original_duplicates),
-        "cleaned_duplicates": int(cleaned_duplicates),
-        "applied_fixes": applied_fixes
-    }
+    summary = dict(
+        metrics,
+        rows_removed=metrics["original_rows"] - metrics["cleaned_rows"],
+        applied_fixes=applied_fixes,
+        correlations=correlations
+    )
     
     # Generate the HTML report
     html_content = generate_html_report(
@@ -57,6 +49,23 @@ def generate_report(original_filepath, cleaned_filepath, applied_fixes):
     
     return report_path
 
+def compare_datasets(original_filepath, cleaned_filepath):
+    """
+    Compute before/after data quality metrics from the two full files.
+    """
+    # Read the original and cleaned data
+    original_df = load_dataset(original_filepath)
+    cleaned_df = load_dataset(cleaned_filepath)
+    
+    return {
+        "original_rows": len(original_df),
+        "cleaned_rows": len(cleaned_df),
+        "original_missing_values": int(original_df.isna().sum().sum()),
+        "cleaned_missing_values": int(cleaned_df.isna().sum().sum()),
+        "original_duplicates": int(original_df.duplicated().sum()),
+        "cleaned_duplicates": int(cleaned_df.duplicated().sum())
+    }
+
 def generate_html_report(original_filepath, cleaned_filepath, summary):
     """Generate an HTML report with data quality information."""
     
@@ -100,6 +109,65 @@ def generate_html_report(original_filepath, cleaned_filepath, summary):
                     <p>Format: {fix.get('format', '')}</p>
                 </div>
                 """
+            elif issue_type == "categorical":
+                fixes_html += f"""
+                <div class="fix-item">
+                    <h4>Categorical Cleanup - Column: {fix.get('column', '')}</h4>
+                    <p>Method: {fix.get('fix_method', '')}</p>
+                    <p>Count: {fix.get('count', 0)} values</p>
+                    {f"<p>Grouped {fix.get('levels', 0)} levels into: {fix.get('constant_value', '')}</p>" if fix.get('fix_method') == 'bucket_rare' else ""}
+                </div>
+                """
+    
+    # Format the strongest relationships between columns
+    correlations = summary["correlations"]
+    statistic_names = {"pearson": "Pearson", "spearman": "Spearman", "cramers_v": "Cramér's V"}
+    correlation_rows = "".join(
+        f"""
+                    <tr>
+                        <td>{pair['columns'][0]}</td>
+                        <td>{pair['columns'][1]}</td>
+                        <td>{statistic_names[statistic]}</td>
+                        <td>{pair['value']}</td>
+                    </tr>"""
+        for statistic in statistic_names
+        for pair in correlations[statistic][:10]
+    )
+    constant_rows = "".join(
+        f"""
+                    <tr>
+                        <td>{column['column']}</td>
+                        <td>{column['top_value']}</td>
+                        <td>{column['top_share']:.1%}</td>
+                        <td>{"Constant" if column['constant'] else "Near-constant"}</td>
+                    </tr>"""
+        for column in correlations["constant_columns"]
+    )
+    correlations_html = f"""
+            <p>Strongest relationships between columns{f" (estimated on a sample of {correlations['rows_used']} rows)" if correlations['sampled'] else ""}:</p>
+            <table>
+                <tr><th>Column</th><th>Column</th><th>Statistic</th><th>Value</th></tr>
+                {correlation_rows}
+            </table>
+            """ if correlation_rows else "<p>No strongly correlated column pairs were found.</p>"
+    if constant_rows:
+        correlations_html += f"""
+            <p>Columns dominated by a single value:</p>
+            <table>
+                <tr><th>Column</th><th>Top value</th><th>Share</th><th>Kind</th></tr>
+                {constant_rows}
+            </table>
+            """
+    
+    # Recommendations derived from the correlation profile
+    redundancy_html = "".join(
+        f"<li>{pair['columns'][0]} and {pair['columns'][1]} are nearly redundant ({statistic_names[pair['statistic']]} {pair['value']}). Consider keeping only one of them.</li>"
+        for pair in correlations["redundant_pairs"]
+    )
+    redundancy_html += "".join(
+        f"<li>{column['column']} is {'constant' if column['constant'] else 'nearly constant'} and carries little information. Consider dropping it.</li>"
+        for column in correlations["constant_columns"]
+    )
     
     # Create overall data quality score (simple version for MVP)
     original_quality_score = calculate_quality_score(
@@ -199,7 +267,7 @@ def generate_html_report(original_filepath, cleaned_filepath, summary):
             <h1>Data Quality Report</h1>
             <p>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
             <p>Original file: {os.path.basename(original_filepath)}</p>
-            <p>Cleaned file: {os.path.basename(cleaned_filepath)}</p>
+            <p>Cleaned file: {os.path.basename(cleaned_filepath) if cleaned_filepath else "(rebuilt from version history)"}</p>
         </div>
         
         <div class="summary-section">
@@ -269,6 +337,11 @@ def generate_html_report(original_filepath, cleaned_filepath, summary):
             {fixes_html if fixes_html else "<p>No fixes were applied to the dataset.</p>"}
         </div>
         
+        <div class="fixes-section">
+            <h2>Correlations and Redundancy</h2>
+            {correlations_html}
+        </div>
+        
         <div class="recommendations">
             <h2>Recommendations for Further Cleaning</h2>
             <ul>
@@ -276,7 +349,7 @@ def generate_html_report(original_filepath, cleaned_filepath, summary):
                 {f"<li>There are still {summary['cleaned_duplicates']} duplicate rows in the dataset. Consider removing them for better analysis.</li>" if summary['cleaned_duplicates'] > 0 else ""}
                 <li>Review the distribution of numeric columns to ensure the data makes sense for your analysis.</li>
                 <li>Consider feature engineering to derive new variables from the existing data.</li>
-                <li>Examine correlations between variables to identify potential redundancies.</li>
+                {redundancy_html}
             </ul>
         </div>
     </body>
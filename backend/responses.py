@@ -0,0 +1,132 @@
+import gzip
+import numpy as np
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without brotli
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes NumPy scalars and arrays directly and uses
+    orjson when it is installed. NaN is written as null.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.integer):
+            return int(o)
+        if isinstance(o, np.floating):
+            return None if np.isnan(o) else float(o)
+        if isinstance(o, np.bool_):
+            return bool(o)
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if 'indent' in kwargs:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        return super().dumps(obj, **kwargs)
+
+def compress_response(response):
+    """
+    Compress JSON responses with brotli or gzip, whichever the client
+    accepts (brotli preferred). Meant to be registered as an after_request
+    hook.
+    """
+    if (
+        response.direct_passthrough
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    return response
+
+def parse_fields(value):
+    """
+    Parse a comma-separated `fields` query parameter into a list, or None.
+    """
+    if not value:
+        return None
+    return [field.strip() for field in value.split(',') if field.strip()]
+
+def _to_columns(records, fields):
+    # list of dicts -> dict of lists, with None where a record lacks a field
+    if fields is None:
+        fields = []
+        for record in records:
+            fields.extend(key for key in record if key not in fields)
+    return {field: [record.get(field) for record in records] for field in fields}
+
+def shape_summary(summary, fields=None, layout='records'):
+    """
+    Trim and reshape a get_data_summary result.
+
+    fields limits each column entry to the given keys ('name' is always
+    kept). The 'columnar' layout turns column_info into a dict of lists,
+    which avoids repeating every key once per column on wide tables.
+    """
+    column_info = summary['column_info']
+    if fields is not None:
+        fields = ['name'] + [field for field in fields if field != 'name']
+        column_info = [{key: info[key] for key in fields if key in info} for info in column_info]
+
+    if layout == 'columnar':
+        column_info = _to_columns(column_info, fields)
+
+    return dict(summary, column_info=column_info)
+
+def shape_issues(issues, fields=None, layout='records'):
+    """
+    Trim and reshape a detect_issues result.
+
+    fields limits each issue entry to the given keys ('issue_type' is
+    always kept). The 'columnar' layout turns every issue group into a dict
+    of lists with the affected columns under 'column'.
+    """
+    if fields is not None:
+        fields = ['issue_type'] + [field for field in fields if field != 'issue_type']
+
+    shaped = {}
+    for issue_group, entries in issues.items():
+        if fields is not None:
+            entries = {
+                col: {key: info[key] for key in fields if key in info}
+                for col, info in entries.items()
+            }
+        if layout == 'columnar':
+            records = [dict(info, column=col) for col, info in entries.items()]
+            entries = _to_columns(records, None if fields is None else ['column'] + fields)
+        shaped[issue_group] = entries
+
+    return shaped
@@ -0,0 +1,156 @@
+import numpy as np
+
+# Odd 64-bit multipliers used to derive independent hash rows
+_ROW_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9
+], dtype=np.uint64)
+
+class CountMinSketch:
+    """
+    Count-Min sketch over 64-bit hashes (e.g. from pd.util.hash_array).
+
+    Estimates never undercount; they overcount by at most
+    e / width * total with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=4):
+        if depth > len(_ROW_MULTIPLIERS):
+            raise ValueError(f'depth must be at most {len(_ROW_MULTIPLIERS)}')
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _buckets(self, hashes, row):
+        with np.errstate(over='ignore'):
+            mixed = hashes * _ROW_MULTIPLIERS[row]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, hashes, counts=None):
+        """Add hashed items, optionally with a count per item."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        counts = np.ones(len(hashes), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        for row in range(self.depth):
+            np.add.at(self.table[row], self._buckets(hashes, row), counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        """Estimated count of each hashed item."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        estimates = [self.table[row][self._buckets(hashes, row)] for row in range(self.depth)]
+        return np.min(estimates, axis=0)
+
+class HeavyHitters:
+    """
+    Misra-Gries summary keeping at most `capacity` candidate items.
+
+    Every item occurring more than total / (capacity + 1) times is
+    guaranteed to be among the candidates. Stored counts are lower bounds.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counts = {}
+
+    def update(self, item_counts):
+        """Merge a mapping of item -> count into the summary."""
+        for item, count in item_counts.items():
+            self.counts[item] = self.counts.get(item, 0) + int(count)
+
+        if len(self.counts) > self.capacity:
+            # Subtract the (capacity + 1)-th largest count from everything
+            cutoff = np.partition(np.fromiter(self.counts.values(), dtype=np.int64), -(self.capacity + 1))[-(self.capacity + 1)]
+            self.counts = {
+                item: count - cutoff for item, count in self.counts.items() if count > cutoff
+            }
+
+    def items(self):
+        return list(self.counts)
+
+class DistinctCounter:
+    """
+    K-minimum-values estimate of the number of distinct 64-bit hashes.
+
+    Exact while fewer than k distinct hashes have been seen; relative
+    error is about 1 / sqrt(k) afterwards.
+    """
+
+    def __init__(self, k=1024):
+        self.k = k
+        self.minimums = np.array([], dtype=np.uint64)
+
+    def add(self, hashes):
+        merged = np.union1d(self.minimums, np.asarray(hashes, dtype=np.uint64))
+        self.minimums = merged[:self.k]
+
+    def estimate(self):
+        if len(self.minimums) < self.k:
+            return len(self.minimums)
+        return int((self.k - 1) * 2.0 ** 64 / (float(self.minimums[-1]) + 1))
+
+class QuantileSketch:
+    """
+    KLL sketch of a stream of floats; NaN values are ignored.
+
+    Items are kept in levels of compactors, an item at level h standing
+    for 2**h inputs. A full compactor is sorted and every other item moves
+    up a level, so memory stays around 3 * k items. Rank error is about
+    1.7 / k. Sketches of separate chunks can be merged.
+    """
+
+    def __init__(self, k=400, seed=0):
+        self.k = k
+        self.levels = [np.array([], dtype=float)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller compactors
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.array([], dtype=float))
+                items = np.sort(self.levels[level])
+                # An odd item out stays behind
+                leftover, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[self.rng.integers(2)::2]])
+            level += 1
+
+    def update(self, values):
+        """Add an array of values."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.array([], dtype=float))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q):
+        """Estimated value at quantile q (a float or an array of floats)."""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([
+            np.full(len(level_items), 2 ** level, dtype=np.int64)
+            for level, level_items in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        ranks = np.asarray(q, dtype=float) * cumulative[-1]
+        positions = np.clip(np.searchsorted(cumulative, ranks, side='left'), 0, len(items) - 1)
+        return items[order][positions]
@@ -0,0 +1,126 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+def get_arrow_path(filepath):
+    """
+    Path of the Arrow IPC (Feather v2) copy kept next to an uploaded CSV.
+    """
+    return os.path.splitext(filepath)[0] + '.arrow'
+
+def write_arrow(df, filepath):
+    """
+    Write the dataframe as an uncompressed Arrow IPC file next to the CSV.
+
+    The file is written to a temporary name and renamed into place so that
+    concurrent workers never map a half-written file. It is left
+    uncompressed because compressed buffers cannot be memory mapped, and
+    as a single record batch so that each column is one contiguous buffer
+    pandas can use without copying (with the default 64K-row batches the
+    chunks of every column would have to be concatenated on load).
+    Returns None if the dataframe has no Arrow representation (e.g. object
+    columns mixing strings and numbers); such files are read from the CSV.
+    """
+    arrow_path = get_arrow_path(filepath)
+    tmp_path = f'{arrow_path}.{os.getpid()}.tmp'
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(1, table.num_rows))
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+def save_dataset(df, filepath):
+    """
+    Save the dataframe as CSV (for download) plus its Arrow copy.
+    """
+    df.to_csv(filepath, index=False)
+    write_arrow(df, filepath)
+
+def _arrow_is_fresh(filepath):
+    arrow_path = get_arrow_path(filepath)
+    return os.path.exists(arrow_path) and os.path.getmtime(arrow_path) >= os.path.getmtime(filepath)
+
+def _ensure_arrow(filepath):
+    """
+    Make sure an up-to-date Arrow copy of the CSV exists.
+
+    Returns the dataframe if the CSV had to be parsed, otherwise None.
+    """
+    if _arrow_is_fresh(filepath):
+        return None
+
+    df = pd.read_csv(filepath)
+    write_arrow(df, filepath)
+    return df
+
+def load_dataset(filepath):
+    """
+    Load a dataset, preferring its memory mapped Arrow copy over the CSV.
+
+    The Arrow file lives in the page cache, so every worker and request
+    that opens it shares the same buffers instead of parsing the CSV into
+    a private copy. Numeric columns without missing values are handed to
+    pandas without copying. The CSV is converted once if the Arrow copy is
+    missing or older than the CSV.
+    """
+    df = _ensure_arrow(filepath)
+    if df is not None:
+        return df
+
+    table = feather.read_table(get_arrow_path(filepath), memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def load_table(filepath):
+    """
+    Open a dataset as a memory mapped Arrow table without converting it to
+    pandas, for requests that only touch a few rows.
+
+    Datasets Arrow cannot store are converted in memory, with mixed-type
+    text columns read as strings.
+    """
+    df = _ensure_arrow(filepath)
+    if df is None or _arrow_is_fresh(filepath):
+        return feather.read_table(get_arrow_path(filepath), memory_map=True)
+
+    object_cols = df.select_dtypes(include=['object']).columns
+    return pa.Table.from_pandas(
+        df.astype({col: 'string' for col in object_cols}),
+        preserve_index=False
+    )
+
+def dataset_shape(filepath):
+    """
+    (rows, columns) of a dataset without loading it.
+
+    Read from the Arrow file footer when an up-to-date copy exists,
+    otherwise estimated from the CSV size and its first lines.
+    """
+    if _arrow_is_fresh(filepath):
+        with pa.memory_map(get_arrow_path(filepath)) as source:
+            reader = pa.ipc.open_file(source)
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            return rows, len(reader.schema)
+
+    sample = pd.read_csv(filepath, nrows=1000)
+    with open(filepath, 'rb') as f:
+        sample_bytes = sum(len(f.readline()) for _ in range(len(sample) + 1))
+    if len(sample) < 1000:
+        return len(sample), len(sample.columns)
+    return int(os.path.getsize(filepath) / sample_bytes * len(sample)), len(sample.columns)
+
+def iter_chunks(filepath, chunk_size=100_000):
+    """
+    Yield a dataset as a sequence of dataframes without loading it whole,
+    chunk_size rows at a time, sliced from the memory mapped Arrow copy
+    when one is up to date or else parsed from the CSV.
+    """
+    if _arrow_is_fresh(filepath):
+        table = feather.read_table(get_arrow_path(filepath), memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    yield from pd.read_csv(filepath, chunksize=chunk_size)
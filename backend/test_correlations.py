@@ -0,0 +1,55 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from correlations import MAX_CATEGORICAL_COLUMNS, cramers_v_pairs, profile_correlations
+
+def cramers_v(a, b):
+    # Direct computation over the rows where both columns are present
+    table = pd.crosstab(a, b).to_numpy(dtype=float)
+    n = table.sum()
+    expected = table.sum(axis=1)[:, None] * table.sum(axis=0)[None, :] / n
+    chi2 = ((table - expected) ** 2 / expected).sum()
+    return np.sqrt(chi2 / n / (min(table.shape) - 1))
+
+def test_cramers_v_matches_direct_computation():
+    rng = np.random.default_rng(0)
+    levels = np.array([3, 5, 4, 7, 2])
+    codes = np.column_stack([rng.integers(0, n, 500) for n in levels])
+    codes[:, 2] = (codes[:, 1] + rng.integers(0, 2, 500)) % levels[2]
+    codes[rng.random(codes.shape) < 0.1] = -1
+
+    found = cramers_v_pairs(codes, levels, min_value=0.0, max_pairs=100, block_cells=2_000)
+    assert len(found) == 10
+    for i, j, v in found:
+        both = (codes[:, i] >= 0) & (codes[:, j] >= 0)
+        assert v == pytest.approx(cramers_v(codes[both, i], codes[both, j]))
+
+def test_cramers_v_memory_is_bounded_at_width():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 30, (5_000, 300))
+    codes[:, 1] = codes[:, 0]
+    codes[rng.random(codes.shape) < 0.05] = -1
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    found = cramers_v_pairs(codes, np.full(300, 30))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert [(i, j) for i, j, _ in found] == [(0, 1)]
+    assert peak < 100 * 1024 * 1024
+    assert elapsed < 30
+
+def test_profile_caps_categorical_columns():
+    rng = np.random.default_rng(0)
+    columns = MAX_CATEGORICAL_COLUMNS + 20
+    df = pd.DataFrame({f'c{i}': rng.choice(list('abcde'), 1_000) for i in range(columns)})
+    df[f'c{columns - 1}'] = df['c0']
+
+    profile = profile_correlations(df)
+    assert profile['cramers_v'] == []
+    df['c1'] = df['c0']
+    assert profile_correlations(df)['cramers_v'] == [{'columns': ['c0', 'c1'], 'value': 1.0}]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from data_processor import detect_issues, _apply_column_block, _apply_numeric_block
+
+def make_cities():
+    # Spelling variants of 'New York' and a level below the rare share
+    values = ['New York'] * 60 + ['new york '] * 5 + ['Boston'] * 30 + ['Chicago'] * 5 + ['Tinytown']
+    return pd.DataFrame({'city': values, 'value': range(len(values))})
+
+def test_detect_issues_categorical_without_rows():
+    issues = detect_issues(make_cities())
+    city = issues['categorical']['city']
+    assert city['variant_clusters']
+    assert city['rare_levels'] == 1
+
+def test_detect_issues_categorical_with_rows():
+    df = make_cities()
+    rows = {}
+    issues = detect_issues(df, rows=rows)
+    assert 'city' in issues['categorical']
+    offending = set(rows[('categorical', 'city')])
+    assert set(df.index[df['city'].isin(['new york ', 'Tinytown'])]) <= offending
+    assert not offending & set(df.index[df['city'] == 'Boston'])
+
+def test_numeric_block_matches_column_fixes():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({f'x{i}': rng.normal(size=500) for i in range(4)})
+    df.iloc[::9] = np.nan
+    df.iloc[::50] = 100.0
+    df['empty'] = np.nan
+    block = [
+        ('x0', [(0, 'missing_values', {'method': 'mean'}), (1, 'outliers', {'method': 'cap'})]),
+        ('x1', [(0, 'missing_values', {'method': 'median'})]),
+        ('x2', [(0, 'missing_values', {'method': 'constant', 'value': 0})]),
+        ('x3', [(1, 'outliers', {'method': 'cap', 'lower_bound': -1, 'upper_bound': 1})]),
+        ('empty', [(0, 'missing_values', {'method': 'median'}), (1, 'outliers', {'method': 'cap'})])
+    ]
+    for (col, series, _, entries), (_, expected, _, expected_entries) in zip(
+        _apply_numeric_block(df, block), _apply_column_block(df, block, {})
+    ):
+        pd.testing.assert_series_equal(series, expected, check_exact=True)
+        assert str(entries) == str(expected_entries)
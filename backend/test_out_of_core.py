@@ -0,0 +1,110 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from data_processor import apply_fixes
+from out_of_core import apply_fixes_out_of_core
+from storage import save_dataset
+
+ROWS = 20_000
+CHUNK_ROWS = 3_000
+
+def make_dataset(filepath, arrow):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'score': rng.normal(50, 10, ROWS).round(2),
+        'amount': rng.exponential(100, ROWS).round(2),
+        'city': rng.choice(['Paris', 'Rome', 'Oslo', 'Lima', None], ROWS),
+        'joined': rng.choice(['2020-01-15', '15/01/2020', '2021-06-30', '30/06/2021', None], ROWS)
+    })
+    df.loc[rng.random(ROWS) < 0.1, 'score'] = np.nan
+    df.loc[rng.random(ROWS) < 0.05, 'amount'] = np.nan
+    df.loc[::97, 'amount'] = 10_000.0
+    # More duplicated rows than fit in one chunk, spread over the file
+    copies = rng.choice(ROWS, 5_000, replace=False)
+    df.iloc[copies] = df.iloc[rng.integers(0, 200, len(copies))].to_numpy()
+    if arrow:
+        save_dataset(df, filepath)
+    else:
+        df.to_csv(filepath, index=False)
+
+def make_fixes(dedup):
+    return {
+        'missing_values': {
+            'score': {'selected': {'method': 'median'}},
+            'amount': {'selected': {'method': 'mean'}},
+            'city': {'selected': {'method': 'mode'}}
+        },
+        'duplicates': {'rows': {'selected': {'method': dedup}}},
+        'outliers': {
+            'score': {'selected': {'method': 'cap'}},
+            'amount': {'selected': {'method': 'cap'}}
+        },
+        'inconsistent_formats': {
+            'joined': {'selected': {'method': 'standardize_date_yyyy_mm_dd', 'format': '%Y-%m-%d'}}
+        }
+    }
+
+def run_both(tmp_path, fixes, exact, arrow=False):
+    filepath = str(tmp_path / 'data.csv')
+    output_path = str(tmp_path / 'cleaned.csv')
+    make_dataset(filepath, arrow)
+
+    expected, expected_log = apply_fixes(pd.read_csv(filepath), json.loads(json.dumps(fixes)))
+    log = apply_fixes_out_of_core(filepath, output_path, fixes, chunk_size=CHUNK_ROWS, exact=exact)
+    # Both sides go through CSV so values compare as written
+    expected = pd.read_csv(io.StringIO(expected.to_csv(index=False)))
+    return pd.read_csv(output_path), log, expected, expected_log
+
+def assert_logs_match(log, expected_log, rel):
+    # Fitted values are compared with a tolerance: means are summed chunk
+    # by chunk, which can differ from pandas in the last bit
+    assert len(log) == len(expected_log)
+    for entry, expected_entry in zip(log, expected_log):
+        fitted = {key for key, value in expected_entry.items() if isinstance(value, float)}
+        assert {key: value for key, value in entry.items() if key not in fitted} == \
+            {key: value for key, value in expected_entry.items() if key not in fitted}
+        for key in fitted:
+            assert entry[key] == pytest.approx(expected_entry[key], rel=rel)
+
+@pytest.mark.parametrize('dedup', ['drop_first', 'drop_last'])
+@pytest.mark.parametrize('arrow', [False, True])
+def test_exact_matches_apply_fixes(tmp_path, dedup, arrow):
+    cleaned, log, expected, expected_log = run_both(tmp_path, make_fixes(dedup), exact=True, arrow=arrow)
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert_logs_match(log, expected_log, rel=1e-12)
+
+@pytest.mark.parametrize('chunk_size', [700, 20_000])
+def test_dedup_across_chunk_sizes(tmp_path, chunk_size):
+    # 700 rows per chunk is far fewer than the 5000 duplicated rows
+    filepath = str(tmp_path / 'data.csv')
+    output_path = str(tmp_path / 'cleaned.csv')
+    make_dataset(filepath, arrow=False)
+    fixes = {'duplicates': {'rows': {'selected': {'method': 'drop_last'}}}}
+
+    expected, expected_log = apply_fixes(pd.read_csv(filepath), json.loads(json.dumps(fixes)))
+    log = apply_fixes_out_of_core(filepath, output_path, fixes, chunk_size=chunk_size)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), expected.reset_index(drop=True))
+    assert log == expected_log
+
+def test_sketch_estimates_are_close(tmp_path):
+    fixes = make_fixes('drop_first')
+    del fixes['duplicates']
+    cleaned, log, expected, expected_log = run_both(tmp_path, fixes, exact=False)
+    # Estimated medians and bounds move the counts of the rows they touch
+    # slightly, so only the fitted values and the row count are compared
+    assert len(cleaned) == len(expected)
+    for entry, expected_entry in zip(log, expected_log):
+        assert (entry['issue_type'], entry['column'], entry['fix_method']) == \
+            (expected_entry['issue_type'], expected_entry['column'], expected_entry['fix_method'])
+        for key in ('fill_value', 'lower_bound', 'upper_bound'):
+            if isinstance(expected_entry.get(key), float):
+                assert entry[key] == pytest.approx(expected_entry[key], rel=0.02)
+
+def test_rejects_whole_dataset_methods(tmp_path):
+    filepath = str(tmp_path / 'data.csv')
+    make_dataset(filepath, arrow=False)
+    fixes = {'outliers': {'score': {'selected': {'method': 'remove'}}}}
+    with pytest.raises(ValueError):
+        apply_fixes_out_of_core(filepath, str(tmp_path / 'cleaned.csv'), fixes)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from storage import save_dataset, load_dataset, iter_chunks
+
+def make_numbers(rows=100_000):
+    # More rows than Arrow's default 64K-row record batch
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'a': rng.normal(size=rows), 'b': rng.integers(0, 100, rows)})
+
+def test_load_dataset_maps_gap_free_columns(tmp_path):
+    filepath = str(tmp_path / 'numbers.csv')
+    save_dataset(make_numbers(), filepath)
+
+    allocated = pa.total_allocated_bytes()
+    df = load_dataset(filepath)
+    assert pa.total_allocated_bytes() == allocated
+    assert not df['a'].to_numpy().flags.writeable
+    assert not df['b'].to_numpy().flags.writeable
+
+def test_iter_chunks_slices_arrow_copy(tmp_path):
+    filepath = str(tmp_path / 'numbers.csv')
+    df = make_numbers()
+    save_dataset(df, filepath)
+
+    chunks = list(iter_chunks(filepath, 30_000))
+    assert [len(chunk) for chunk in chunks] == [30_000, 30_000, 30_000, 10_000]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
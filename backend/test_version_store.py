@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from data_processor import apply_fixes
+from version_store import (
+    ROOT_VERSION, compute_diff, compose_diffs, apply_diff, load_version, sample_version,
+    commit_version, version_metrics
+)
+
+FIRST_ROUND = {
+    'missing_values': {
+        'score': {'selected': {'method': 'mean'}},
+        'city': {'selected': {'method': 'drop'}}
+    }
+}
+SECOND_ROUND = {
+    'duplicates': {'rows': {'selected': {'method': 'drop_first'}}},
+    'outliers': {'score': {'selected': {'method': 'cap'}}},
+    'categorical': {'note': {'selected': {'method': 'drop_column'}}}
+}
+
+def make_dataset(filepath):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'score': rng.normal(size=300),
+        'city': rng.choice(['Paris', 'Rome', None], 300),
+        'note': rng.choice(['a', 'b'], 300)
+    })
+    df.loc[::7, 'score'] = np.nan
+    df.loc[::50, 'score'] = 40.0
+    df.iloc[100:120] = df.iloc[0:20].to_numpy()
+    df.to_csv(filepath, index=False)
+
+def make_chain(filepath):
+    # Two cleaning rounds, returning the dataframe after each
+    base = load_version(filepath, ROOT_VERSION)
+    first, first_log = apply_fixes(base, FIRST_ROUND)
+    first_id = commit_version(filepath, ROOT_VERSION, base, first, first_log)
+    parent = load_version(filepath, first_id)
+    second, second_log = apply_fixes(parent, SECOND_ROUND)
+    second_id = commit_version(filepath, first_id, parent, second, second_log)
+    return base, (first_id, first), (second_id, second)
+
+def test_load_version_rebuilds_each_round(tmp_path):
+    filepath = str(tmp_path / 'data.csv')
+    make_dataset(filepath)
+    _, (first_id, first), (second_id, second) = make_chain(filepath)
+
+    pd.testing.assert_frame_equal(load_version(filepath, first_id), first.reset_index(drop=True))
+    rebuilt = load_version(filepath, second_id)
+    assert 'note' not in rebuilt.columns
+    pd.testing.assert_frame_equal(rebuilt, second.reset_index(drop=True))
+
+def test_compose_diffs_matches_chained_diffs(tmp_path):
+    filepath = str(tmp_path / 'data.csv')
+    make_dataset(filepath)
+    base, (first_id, first), _ = make_chain(filepath)
+    parent = first.reset_index(drop=True)
+    second, _ = apply_fixes(parent, SECOND_ROUND)
+
+    composed = compose_diffs([compute_diff(base, first), compute_diff(parent, second)])
+    assert composed['dropped_columns'] == ['note']
+    pd.testing.assert_frame_equal(apply_diff(base, composed), second.reset_index(drop=True))
+
+def test_sample_version(tmp_path):
+    filepath = str(tmp_path / 'data.csv')
+    make_dataset(filepath)
+    _, _, (second_id, second) = make_chain(filepath)
+    full = load_version(filepath, second_id)
+
+    sample, total_rows = sample_version(filepath, second_id, 10 ** 6)
+    assert total_rows == len(full)
+    pd.testing.assert_frame_equal(sample, full)
+
+    sample, total_rows = sample_version(filepath, second_id, 50)
+    assert total_rows == len(full) and len(sample) == 50
+    assert list(sample.dtypes) == list(full.dtypes)
+    # Every sampled row is a row of the version
+    matched = sample.merge(full.drop_duplicates(), how='left', indicator=True)
+    assert (matched['_merge'] == 'both').all()
+
+def test_version_metrics(tmp_path):
+    filepath = str(tmp_path / 'data.csv')
+    make_dataset(filepath)
+    base, _, (second_id, second) = make_chain(filepath)
+
+    assert version_metrics(filepath, second_id) == {
+        'original_rows': len(base),
+        'cleaned_rows': len(second),
+        'original_missing_values': int(base.isna().sum().sum()),
+        'cleaned_missing_values': int(second.isna().sum().sum()),
+        'original_duplicates': int(base.duplicated().sum()),
+        'cleaned_duplicates': int(second.duplicated().sum())
+    }
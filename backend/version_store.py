@@ -0,0 +1,376 @@
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from storage import load_dataset
+
+ROOT_VERSION = 'v0'
+
+def get_store_dir(filepath):
+    """
+    Directory holding the cleaning rounds of an uploaded dataset.
+    """
+    return os.path.splitext(filepath)[0] + '.versions'
+
+def _manifest_path(filepath):
+    return os.path.join(get_store_dir(filepath), 'manifest.json')
+
+@contextmanager
+def _locked(filepath):
+    # Serialize manifest updates across workers
+    store_dir = get_store_dir(filepath)
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _write_manifest(filepath, manifest):
+    path = _manifest_path(filepath)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def load_manifest(filepath):
+    """
+    Read the version manifest, starting a new one (holding only the
+    uploaded file as the root version) if there is none or the upload was
+    replaced since.
+    """
+    path = _manifest_path(filepath)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest['source_mtime'] == os.path.getmtime(filepath):
+            return manifest
+
+    with _locked(filepath):
+        # Another worker may have started the store meanwhile
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest['source_mtime'] == os.path.getmtime(filepath):
+                return manifest
+
+        df = load_dataset(filepath)
+        manifest = {
+            'source_mtime': os.path.getmtime(filepath),
+            'head': ROOT_VERSION,
+            'versions': [{
+                'id': ROOT_VERSION,
+                'parent': None,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'rows': len(df),
+                'columns': len(df.columns),
+                'applied_fixes': []
+            }]
+        }
+        _write_manifest(filepath, manifest)
+    return manifest
+
+def _get_version(manifest, version_id):
+    for version in manifest['versions']:
+        if version['id'] == version_id:
+            return version
+    raise KeyError(f'Unknown version {version_id!r}')
+
+def _lineage(manifest, version_id):
+    # Versions from the root down to version_id
+    chain = []
+    while version_id is not None:
+        version = _get_version(manifest, version_id)
+        chain.append(version)
+        version_id = version['parent']
+    return chain[::-1]
+
+def compute_diff(parent_df, child_df):
+    """
+    Describe child_df as a diff against parent_df.
+
+    child_df must keep the parent's row labels for surviving rows, as
+    apply_fixes does. The diff holds a keep mask over the parent rows,
+    patches of changed cells per column (values indexed by parent row
+    position) and the names of dropped columns. A column whose dtype
+    changed is patched in full.
+    """
+    positions = parent_df.index.get_indexer(child_df.index)
+    keep = np.zeros(len(parent_df), dtype=bool)
+    keep[positions] = True
+
+    patches = {}
+    for col in child_df.columns:
+        new_values = child_df[col]
+        if col not in parent_df.columns or parent_df[col].dtype != new_values.dtype:
+            patches[col] = pd.Series(new_values.to_numpy(), index=positions)
+            continue
+
+        old_values = parent_df[col].iloc[positions]
+        changed = (old_values.to_numpy() != new_values.to_numpy()) & ~(old_values.isna().to_numpy() & new_values.isna().to_numpy())
+        if changed.any():
+            patches[col] = pd.Series(new_values.to_numpy()[changed], index=positions[changed])
+
+    return {
+        'keep': keep,
+        'patches': patches,
+        'dropped_columns': [col for col in parent_df.columns if col not in child_df.columns]
+    }
+
+def _write_diff(diff_dir, diff):
+    os.makedirs(diff_dir, exist_ok=True)
+    np.save(os.path.join(diff_dir, 'keep.npy'), np.packbits(diff['keep']))
+
+    patch_files = {}
+    for i, (col, patch) in enumerate(diff['patches'].items()):
+        try:
+            values = pa.array(patch.to_numpy(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type text columns are stored as strings
+            values = pa.array(patch.astype(str).where(patch.notna(), None).to_numpy(), from_pandas=True)
+        table = pa.table({'row': pa.array(patch.index.to_numpy(dtype=np.int64)), 'value': values})
+        feather.write_feather(table, os.path.join(diff_dir, f'patch_{i}.arrow'), compression='uncompressed')
+        patch_files[col] = f'patch_{i}.arrow'
+
+    with open(os.path.join(diff_dir, 'diff.json'), 'w') as f:
+        json.dump({
+            'parent_rows': int(len(diff['keep'])),
+            'patch_files': patch_files,
+            'dropped_columns': diff['dropped_columns']
+        }, f)
+
+def _read_diff(diff_dir):
+    with open(os.path.join(diff_dir, 'diff.json')) as f:
+        info = json.load(f)
+
+    keep = np.unpackbits(np.load(os.path.join(diff_dir, 'keep.npy')), count=info['parent_rows']).astype(bool)
+    patches = {}
+    for col, filename in info['patch_files'].items():
+        table = feather.read_table(os.path.join(diff_dir, filename), memory_map=True)
+        patches[col] = pd.Series(
+            table.column('value').to_pandas().to_numpy(),
+            index=table.column('row').to_numpy()
+        )
+    return {'keep': keep, 'patches': patches, 'dropped_columns': info['dropped_columns']}
+
+def compose_diffs(diffs):
+    """
+    Fold a chain of diffs into one diff against the first parent.
+
+    Patch positions are translated to the first parent's row positions and
+    later patches of the same cell win.
+    """
+    composed = {'keep': None, 'patches': {}, 'dropped_columns': []}
+    base_positions = None
+
+    for diff in diffs:
+        if base_positions is None:
+            base_positions = np.arange(len(diff['keep']))
+            composed['keep'] = np.ones(len(diff['keep']), dtype=bool)
+
+        for col, patch in diff['patches'].items():
+            translated = pd.Series(patch.to_numpy(), index=base_positions[patch.index.to_numpy()])
+            if col in composed['patches']:
+                combined = pd.concat([composed['patches'][col], translated])
+                translated = combined[~combined.index.duplicated(keep='last')]
+            composed['patches'][col] = translated
+
+        for col in diff['dropped_columns']:
+            composed['patches'].pop(col, None)
+            composed['dropped_columns'].append(col)
+
+        composed['keep'][base_positions[~diff['keep']]] = False
+        base_positions = base_positions[diff['keep']]
+
+    return composed
+
+def _patched_column(base_df, col, patch):
+    # Base column with the patch applied, over all base rows
+    if col not in base_df.columns:
+        values = pd.Series(None, index=range(len(base_df)), dtype=object)
+    else:
+        values = base_df[col].reset_index(drop=True)
+    if patch.dtype != values.dtype:
+        if pd.api.types.is_numeric_dtype(patch.dtype) and pd.api.types.is_numeric_dtype(values.dtype):
+            values = values.astype(np.result_type(patch.dtype, values.dtype))
+        else:
+            values = values.astype(object)
+    values = values.copy()
+    values.iloc[patch.index.to_numpy()] = patch.to_numpy()
+    return values
+
+def apply_diff(base_df, diff):
+    """
+    Rebuild a version from its base dataframe and a (composed) diff.
+    """
+    columns = [col for col in base_df.columns if col not in diff['dropped_columns']]
+    columns += [col for col in diff['patches'] if col not in columns]
+
+    data = {}
+    for col in columns:
+        if col in diff['patches']:
+            data[col] = _patched_column(base_df, col, diff['patches'][col])[diff['keep']].infer_objects()
+        else:
+            data[col] = base_df[col].reset_index(drop=True)[diff['keep']]
+    return pd.DataFrame(data, columns=columns).reset_index(drop=True)
+
+def _version_diffs(filepath, manifest, version_id):
+    return [
+        _read_diff(os.path.join(get_store_dir(filepath), version['id']))
+        for version in _lineage(manifest, version_id)[1:]
+    ]
+
+def load_version(filepath, version_id):
+    """
+    Materialize any version: the uploaded file with the composed diffs of
+    every round up to version_id applied.
+    """
+    manifest = load_manifest(filepath)
+    df = load_dataset(filepath)
+    diffs = _version_diffs(filepath, manifest, version_id)
+    if not diffs:
+        return df
+    return apply_diff(df, compose_diffs(diffs))
+
+def sample_version(filepath, version_id, n_rows, random_state=0):
+    """
+    Materialize a random sample of at most n_rows rows of a version,
+    patching only the sampled rows. Returns the sample and the number of
+    rows of the full version.
+    """
+    manifest = load_manifest(filepath)
+    base_df = load_dataset(filepath)
+    diffs = _version_diffs(filepath, manifest, version_id)
+    diff = compose_diffs(diffs) if diffs else {
+        'keep': np.ones(len(base_df), dtype=bool), 'patches': {}, 'dropped_columns': []
+    }
+
+    positions = np.flatnonzero(diff['keep'])
+    total_rows = len(positions)
+    if total_rows > n_rows:
+        positions = np.sort(np.random.default_rng(random_state).choice(positions, n_rows, replace=False))
+
+    # Patches re-indexed to positions within the sample
+    patches = {}
+    for col, patch in diff['patches'].items():
+        rows = patch.index.to_numpy()
+        where = np.minimum(np.searchsorted(positions, rows), max(len(positions) - 1, 0))
+        sampled = (positions[where] == rows) if len(positions) else np.zeros(len(rows), dtype=bool)
+        patches[col] = pd.Series(patch.to_numpy()[sampled], index=where[sampled])
+
+    sample = apply_diff(base_df.iloc[positions], {
+        'keep': np.ones(len(positions), dtype=bool),
+        'patches': patches,
+        'dropped_columns': diff['dropped_columns']
+    })
+    return sample, total_rows
+
+def commit_version(filepath, parent_id, parent_df, child_df, applied_fixes):
+    """
+    Record child_df (the result of apply_fixes on parent_df) as a new
+    cleaning round on top of parent_id, make it the head and return its id.
+    """
+    diff = compute_diff(parent_df, child_df)
+    load_manifest(filepath)
+
+    with _locked(filepath):
+        with open(_manifest_path(filepath)) as f:
+            manifest = json.load(f)
+        _get_version(manifest, parent_id)
+
+        version_id = f"v{len(manifest['versions'])}"
+        _write_diff(os.path.join(get_store_dir(filepath), version_id), diff)
+
+        manifest['versions'].append({
+            'id': version_id,
+            'parent': parent_id,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(child_df),
+            'columns': len(child_df.columns),
+            'rows_removed': int((~diff['keep']).sum()),
+            'cells_changed': int(sum(len(patch) for patch in diff['patches'].values())),
+            'applied_fixes': applied_fixes
+        })
+        manifest['head'] = version_id
+        _write_manifest(filepath, manifest)
+
+    return version_id
+
+def rollback(filepath, version_id):
+    """
+    Make an earlier version the head. Only the manifest changes; later
+    versions are kept so they can be restored the same way.
+    """
+    load_manifest(filepath)
+    with _locked(filepath):
+        with open(_manifest_path(filepath)) as f:
+            manifest = json.load(f)
+        _get_version(manifest, version_id)
+        manifest['head'] = version_id
+        _write_manifest(filepath, manifest)
+    return manifest
+
+def get_applied_fixes(filepath, version_id):
+    """
+    Applied-fix log of every round from the upload up to version_id.
+    """
+    manifest = load_manifest(filepath)
+    return [entry for version in _lineage(manifest, version_id) for entry in version['applied_fixes']]
+
+def _row_hashes(columns, length):
+    # Combine per-column hashes into one 64-bit hash per row
+    combined = np.zeros(length, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for values in columns:
+            combined = combined * np.uint64(1000003) ^ pd.util.hash_array(np.asarray(values))
+    return combined
+
+def version_metrics(filepath, version_id, base_id=ROOT_VERSION):
+    """
+    Before/after data quality metrics of version_id against base_id (the
+    uploaded file by default), computed from the base data and the composed
+    diff without materializing the cleaned dataset.
+    """
+    manifest = load_manifest(filepath)
+    lineage = [version['id'] for version in _lineage(manifest, version_id)]
+    if base_id not in lineage:
+        raise ValueError(f'{base_id!r} is not an ancestor of {version_id!r}')
+
+    base_df = load_version(filepath, base_id)
+    diffs = _version_diffs(filepath, manifest, version_id)[lineage.index(base_id):]
+    diff = compose_diffs(diffs) if diffs else {
+        'keep': np.ones(len(base_df), dtype=bool), 'patches': {}, 'dropped_columns': []
+    }
+    keep = diff['keep']
+
+    columns = [col for col in base_df.columns if col not in diff['dropped_columns']]
+    columns += [col for col in diff['patches'] if col not in columns]
+
+    # Missing values of kept rows, corrected for patched cells
+    cleaned_missing = 0
+    after_columns = []
+    for col in columns:
+        if col in diff['patches']:
+            values = _patched_column(base_df, col, diff['patches'][col])
+        else:
+            values = base_df[col]
+        cleaned_missing += int(values.isna().to_numpy()[keep].sum())
+        after_columns.append(values.to_numpy())
+
+    original_hashes = _row_hashes([base_df[col].to_numpy() for col in base_df.columns], len(base_df))
+    cleaned_hashes = _row_hashes(after_columns, len(base_df))[keep]
+
+    return {
+        'original_rows': int(len(base_df)),
+        'cleaned_rows': int(keep.sum()),
+        'original_missing_values': int(base_df.isna().sum().sum()),
+        'cleaned_missing_values': cleaned_missing,
+        'original_duplicates': int(pd.Series(original_hashes).duplicated().sum()),
+        'cleaned_duplicates': int(pd.Series(cleaned_hashes).duplicated().sum())
+    }
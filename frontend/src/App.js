@@ -16,6 +16,7 @@ function App() {
   const [fixes, setFixes] = useState(null);
   const [appliedFixes, setAppliedFixes] = useState(null);
   const [cleanedFilepath, setCleanedFilepath] = useState(null);
+  const [versionId, setVersionId] = useState(null);
   const [error, setError] = useState(null);
   const [loading, setLoading] = useState(false);
 
@@ -78,11 +79,13 @@ function App() {
     try {
       const response = await axios.post('http://localhost:5000/api/apply-fixes', {
         filepath: uploadData.filepath,
-        fixes: selectedFixes
+        fixes: selectedFixes,
+        issues: issues
       });
       
       setAppliedFixes(response.data.applied_fixes);
       setCleanedFilepath(response.data.output_filepath);
+      setVersionId(response.data.version_id);
       setCurrentStep(5);
     } catch (error) {
       console.error('Error applying fixes:', error);
@@ -217,6 +220,7 @@ function App() {
           <ReportDownload 
             originalFilepath={uploadData?.filepath}
             cleanedFilepath={cleanedFilepath}
+            versionId={versionId}
             appliedFixes={appliedFixes}
             className={currentStep !== 5 ? 'hidden' : ''}
           />
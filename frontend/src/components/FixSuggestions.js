@@ -1,7 +1,21 @@
 import React, { useState } from 'react';
 
 const FixSuggestions = ({ fixes, onApplyFixes }) => {
-  const [selectedFixes, setSelectedFixes] = useState({});
+  // Start from the selections reused from earlier extracts of the same feed
+  const [selectedFixes, setSelectedFixes] = useState(() => {
+    const preselected = {};
+    Object.entries(fixes || {}).forEach(([issueType, columns]) => {
+      Object.entries(columns).forEach(([column, fixInfo]) => {
+        if (fixInfo.selected) {
+          preselected[issueType] = {
+            ...preselected[issueType],
+            [column]: { selected: fixInfo.selected }
+          };
+        }
+      });
+    });
+    return preselected;
+  });
   const [isApplying, setIsApplying] = useState(false);
 
   // Check if there are any fixes
@@ -161,6 +175,28 @@ const FixSuggestions = ({ fixes, onApplyFixes }) => {
         </FixSection>
       )}
       
+      {/* Categorical Fixes */}
+      {fixes.categorical && (
+        <FixSection 
+          title="Categorical Cleanup"
+          icon={
+            <svg className="h-5 w-5 text-teal-500" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+              <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M7 7h.01M7 3h5c.512 0 1.024.195 1.414.586l7 7a2 2 0 010 2.828l-7 7a2 2 0 01-2.828 0l-7-7A1.994 1.994 0 013 12V7a4 4 0 014-4z" />
+            </svg>
+          }
+        >
+          {Object.entries(fixes.categorical).map(([column, fix]) => (
+            <FixOptions
+              key={column}
+              title={`Column: ${column}`}
+              options={fix.options}
+              selected={selectedFixes.categorical?.[column]?.selected}
+              onSelect={(option) => handleFixSelection('categorical', column, option)}
+            />
+          ))}
+        </FixSection>
+      )}
+      
       <div className="mt-6 flex justify-end">
         <button 
           onClick={handleApplyFixes}
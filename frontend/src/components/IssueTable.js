@@ -140,6 +140,36 @@ const IssueTable = ({ issues, onSelectFixes }) => {
         </IssueSection>
       )}
       
+      {/* Categorical Issues Section */}
+      {issues.categorical && (
+        <IssueSection 
+          title="Categorical Values" 
+          description="These text columns have spelling variants, rare levels or ID-like values."
+          icon={
+            <svg className="h-5 w-5 text-teal-500" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+              <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M7 7h.01M7 3h5c.512 0 1.024.195 1.414.586l7 7a2 2 0 010 2.828l-7 7a2 2 0 01-2.828 0l-7-7A1.994 1.994 0 013 12V7a4 4 0 014-4z" />
+            </svg>
+          }
+          color="teal"
+        >
+          {Object.entries(issues.categorical).map(([column, info]) => (
+            <IssueItem 
+              key={column}
+              title={`Column: ${column}`}
+              description={[
+                info.variant_clusters.length > 0 && `${info.variant_clusters.length} groups of spelling variants`,
+                info.rare_levels > 0 && `~${info.rare_levels} rare levels covering ${info.rare_rows} rows`,
+                info.id_like && `ID-like (~${info.distinct_estimate} distinct values)`
+              ].filter(Boolean).join(', ')}
+              details={info.variant_clusters.length > 0
+                ? `Variants: ${info.variant_clusters.map(c => [c.canonical, ...c.variants].join(' / ')).join('; ')}`
+                : null}
+              color="teal"
+            />
+          ))}
+        </IssueSection>
+      )}
+      
       <div className="mt-6 flex justify-end">
         <button 
           onClick={() => onSelectFixes(issues)}
@@ -159,6 +189,7 @@ const IssueSection = ({ title, description, icon, color, children }) => {
     orange: 'bg-orange-50 border-orange-100',
     purple: 'bg-purple-50 border-purple-100',
     blue: 'bg-blue-50 border-blue-100',
+    teal: 'bg-teal-50 border-teal-100',
   };
 
   const titleColors = {
@@ -166,6 +197,7 @@ const IssueSection = ({ title, description, icon, color, children }) => {
     orange: 'text-orange-700',
     purple: 'text-purple-700',
     blue: 'text-blue-700',
+    teal: 'text-teal-700',
   };
 
   return (
@@ -188,6 +220,7 @@ const IssueItem = ({ title, description, details, color }) => {
     orange: 'bg-orange-100',
     purple: 'bg-purple-100',
     blue: 'bg-blue-100',
+    teal: 'bg-teal-100',
   };
 
   return (
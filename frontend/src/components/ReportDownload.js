@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import axios from 'axios';
 
-const ReportDownload = ({ originalFilepath, cleanedFilepath, appliedFixes }) => {
+const ReportDownload = ({ originalFilepath, cleanedFilepath, versionId, appliedFixes }) => {
   const [isGenerating, setIsGenerating] = useState(false);
   const [reportUrl, setReportUrl] = useState(null);
   const [error, setError] = useState(null);
@@ -19,6 +19,7 @@ const ReportDownload = ({ originalFilepath, cleanedFilepath, appliedFixes }) =>
       const response = await axios.post('http://localhost:5000/api/generate-report', {
         original_filepath: originalFilepath,
         cleaned_filepath: cleanedFilepath,
+        version_id: versionId,
         applied_fixes: appliedFixes
       });
 